@@ -1178,8 +1178,11 @@ class TuskApp {
         const reader = new FileReader();
         reader.onload = (event) => {
             try {
-                const imported = JSON.parse(event.target.result);
-                if (Array.isArray(imported)) {
+                const parsed = JSON.parse(event.target.result);
+                // Accept the Streamlit app's {tasks: [...]} backups as well as our own arrays
+                const records = Array.isArray(parsed) ? parsed : (parsed && parsed.tasks);
+                if (Array.isArray(records)) {
+                    const imported = records.map(t => this.normalizeImportedTask(t));
                     this.tasks = [...imported, ...this.tasks];
                     this.saveToStorage();
                     this.render();
@@ -1195,6 +1198,26 @@ class TuskApp {
         e.target.value = '';
     }
     
+    normalizeImportedTask(t) {
+        // Streamlit format: task/status/scheduled_date/start_time/end_time/added_at
+        if (!('task' in t || 'status' in t)) return t;
+        const toIso = (local) => local ? new Date(local.replace(' ', 'T')).toISOString() : new Date().toISOString();
+        const task = {
+            id: String(t.id),
+            name: t.task,
+            priority: t.priority || 'Medium',
+            category: t.category || 'General',
+            dueDate: t.scheduled_date || null,
+            dueTime: t.start_time || null,
+            endTime: t.end_time || null,
+            completed: t.status === 'completed',
+            remembered: !!t.remembered,
+            createdAt: toIso(t.added_at)
+        };
+        if (task.completed && t.completed_at) task.completedAt = toIso(t.completed_at);
+        return task;
+    }
+    
     // Bulk Actions
     selectAll() {
         const tasks = this.getFilteredTasks();
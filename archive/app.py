@@ -10,10 +10,29 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, date, time, timedelta
 import uuid
+import io
 import json
+import logging
 import os
 import re
-from collections import defaultdict
+import bisect
+import heapq
+import asyncio
+import functools
+import hashlib
+import hmac
+import html
+import secrets
+import tempfile
+import threading
+from urllib.parse import urlsplit, parse_qs
+from collections import defaultdict, deque, OrderedDict
+
+from schema_bridge import iter_task_records, to_python_task
+from task_snapshot import open_snapshot, snapshot_path, write_snapshot
+from calendar_ics import iter_ics_tasks, write_ics
+
+logger = logging.getLogger("tusk")
 
 
 # ============================================================
@@ -32,6 +51,63 @@ st.set_page_config(
 # ============================================================
 DATA_FILE = "tasks_data.json"
 TEMPLATES_FILE = "task_templates.json"
+CHANGES_FILE = "tasks_changes.jsonl"
+CHANGE_FEED_LIMIT = 5000
+FOCUS_LOG_FILE = "tasks_focus.jsonl"
+TEMPLATE_MAX_TASKS = 50
+TEMPLATE_MAX_HOURS = 12
+# Undo history per browser tab; TUSK_PERSIST_UNDO=1 keeps it across reloads in
+# tasks_undo.<id>.jsonl, with the id carried in the ?history= link. Logs idle for
+# UNDO_KEEP_DAYS are removed.
+UNDO_FILE = "tasks_undo.{}.jsonl"
+UNDO_KEEP_DAYS = 7
+UNDO_LIMIT = 50
+UNDO_MAX_RECORDS = 50000
+PERSIST_UNDO = os.environ.get("TUSK_PERSIST_UNDO", "0") == "1"
+# Keep a binary snapshot (tasks_data.snap) next to each data file for faster loads
+USE_SNAPSHOTS = os.environ.get("TUSK_SNAPSHOTS", "0") == "1"
+
+# Workspaces: a signed-in user (st.user) gets their own partition, anyone else a
+# random private one carried in the ?workspace= link. The shared "default" workspace
+# (the top-level files) is only used with TUSK_SHARED_WORKSPACE=1; otherwise the
+# first workspace opened takes over the top-level files of an older install.
+DEFAULT_WORKSPACE = "default"
+SHARED_WORKSPACE = os.environ.get("TUSK_SHARED_WORKSPACE", "0") == "1"
+USER_WORKSPACE_PREFIX = "user-"
+WORKSPACES_DIR = os.environ.get("TUSK_WORKSPACES_DIR", "workspaces")
+WORKSPACE_NAME_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,64}')
+WORKSPACE_IDLE_SECONDS = 600
+MAX_RESIDENT_WORKSPACES = 256
+
+# Reminders: heads-up before a task starts, and a notice when it becomes overdue
+REMINDER_LEAD_MINUTES = 10
+REMINDER_EVENT_LIMIT = 500
+REMINDER_CHECK_SECONDS = 15
+
+# Retention: completed tasks older than N days, or beyond the newest M, leave the data
+# file - appended to tasks_archive.jsonl, or dropped with TUSK_RETENTION_MODE=drop.
+# 0 disables a rule.
+RETENTION_DAYS = int(os.environ.get("TUSK_RETENTION_DAYS", "0"))
+RETENTION_MAX_COMPLETED = int(os.environ.get("TUSK_RETENTION_MAX_COMPLETED", "0"))
+RETENTION_MODE = os.environ.get("TUSK_RETENTION_MODE", "archive")
+if RETENTION_MODE not in ("archive", "drop"):
+    raise ValueError(f"TUSK_RETENTION_MODE must be 'archive' or 'drop', not {RETENTION_MODE!r}")
+ARCHIVE_FILE = "tasks_archive.jsonl"
+RETENTION_INTERVAL_SECONDS = 3600
+RETENTION_BATCH = 1000
+
+# Top-level files an install from before workspaces keeps its data in
+LEGACY_FILES = (DATA_FILE, CHANGES_FILE, FOCUS_LOG_FILE, TEMPLATES_FILE, ARCHIVE_FILE)
+
+# Local JSON API, off unless TUSK_API_PORT is set. Every request needs the
+# X-Tusk-Token header matching TUSK_API_TOKEN; browsers are only let in from the
+# comma-separated origins in TUSK_API_ORIGINS.
+API_HOST = os.environ.get("TUSK_API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("TUSK_API_PORT", "0"))
+API_TOKEN = os.environ.get("TUSK_API_TOKEN", "")
+API_TOKEN_HEADER = "X-Tusk-Token"
+API_ORIGINS = frozenset(o.strip() for o in os.environ.get("TUSK_API_ORIGINS", "").split(",") if o.strip())
+API_MAX_BODY_BYTES = 64 * 1024 * 1024
 
 CATEGORY_COLORS = {
     'Work': '#3b82f6',
@@ -45,8 +121,27 @@ CATEGORY_COLORS = {
 PRIORITY_ORDER = {"High": 1, "Medium": 2, "Low": 3}
 PRIORITY_ICONS = {"High": "🔴", "Medium": "🟡", "Low": "🟢"}
 
+# "Do next" ranking weights
+PRIORITY_WEIGHTS = {"High": 30, "Medium": 20, "Low": 10}
+CATEGORY_WEIGHTS = {'Work': 5, 'Finance': 4, 'Health': 4, 'Learning': 2, 'Personal': 2, 'General': 0}
+URGENCY_HORIZON_HOURS = 72   # urgency starts ramping up this long before end_time
+URGENCY_MAX = 40             # reached at end_time
+OVERDUE_POINTS_PER_HOUR = 1  # keeps growing after end_time
+QUICK_WIN_POINTS = 5         # bonus for short tasks, fading out at 2.5h
+DO_NEXT_COUNT = 5
+
 CATEGORIES = ["General", "Work", "Personal", "Health", "Learning", "Finance"]
 
+# Auto-scheduler working window
+WORKDAY_START = time(8, 0)
+WORKDAY_END = time(20, 0)
+SCHEDULE_HORIZON_DAYS = 7
+SLOT_MINUTES = 15
+
+# Task cards rendered per tab before "Show more"
+TASK_PAGE_SIZE = 50
+CARD_CACHE_SIZE = 2000
+
 CATEGORY_KEYWORDS = {
     'Work': ['work', 'meeting', 'project', 'client', 'email', 'call', 'presentation', 'office'],
     'Personal': ['personal', 'home', 'family', 'friend', 'birthday', 'party'],
@@ -55,46 +150,191 @@ CATEGORY_KEYWORDS = {
     'Finance': ['finance', 'budget', 'pay', 'bill', 'invoice', 'money', 'bank', 'tax']
 }
 
-# Funny GIFs for different states
-GIFS = {
-    'empty_active': 'https://media.giphy.com/media/3o7btPCcdNniyf0ArS/giphy.gif',
-    'empty_upcoming': 'https://media.giphy.com/media/l0MYt5jPR6QX5pnqM/giphy.gif',
-    'empty_done': 'https://media.giphy.com/media/3oKIPnAiaMCws8nOsE/giphy.gif',
-    'empty_analytics': 'https://media.giphy.com/media/xT5LMHxhOfscxPfIfm/giphy.gif',
-    'celebrate_high': 'https://media.giphy.com/media/g9582DNuQppxC/giphy.gif',
-    'celebrate_medium': 'https://media.giphy.com/media/l0MYGb1LuZ3n7dRnO/giphy.gif',
-    'motivate_low': 'https://media.giphy.com/media/ACcXRXwUqJ6Ok/giphy.gif',
-    'pomodoro_focus': 'https://media.giphy.com/media/IPbS5R4fSUl5S/giphy.gif',
-    'pomodoro_break': 'https://media.giphy.com/media/l0HlBO7eyXzSZkJri/giphy.gif',
-}
+# Images and styles live in assets/. The GIFs listed in assets/manifest.json are only
+# shown once bundle_assets.py has downloaded them into assets/gifs/; until then, and
+# always with TUSK_LITE_ASSETS=1, emoji art stands in. Nothing is loaded remotely.
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+GIFS_DIR = os.path.join(ASSETS_DIR, "gifs")
+LITE_ASSETS = os.environ.get("TUSK_LITE_ASSETS", "0") == "1"
+
+# Simulated time for demos and load tests, e.g. TUSK_SIMULATED_START=2026-03-02T08:00
+# with TUSK_CLOCK_SPEED=3600 runs an hour per real second (0 = frozen until advanced)
+SIMULATED_START = os.environ.get("TUSK_SIMULATED_START")
+CLOCK_SPEED = float(os.environ.get("TUSK_CLOCK_SPEED", "1"))
 
 
 # ============================================================
 # SECTION 4: DATA PERSISTENCE FUNCTIONS
 # ============================================================
-def load_tasks():
-    if os.path.exists(DATA_FILE):
+def workspace_file(workspace, filename):
+    """Path of a workspace's file; the default workspace uses the top-level files"""
+    if workspace == DEFAULT_WORKSPACE:
+        return filename
+    return os.path.join(WORKSPACES_DIR, workspace, filename)
+
+
+def session_data_file():
+    return workspace_file(st.session_state.workspace, DATA_FILE)
+
+
+def load_tasks(path=DATA_FILE):
+    if USE_SNAPSHOTS:
+        snapshot = open_snapshot(path)
+        if snapshot is not None:
+            with snapshot:
+                return snapshot.tasks()
+    if os.path.exists(path):
         try:
-            with open(DATA_FILE, 'r') as f:
-                return json.load(f)
+            with open(path, 'r') as f:
+                source = os.fstat(f.fileno())
+                tasks = json.load(f)
         except:
             return []
+        if USE_SNAPSHOTS:
+            # Missing or stale (e.g. the file was edited by hand): rebuild it, stamped
+            # with the file that was read even if a save has replaced it since
+            write_snapshot(tasks, path, source)
+        return tasks
     return []
 
 
-def save_tasks(tasks):
-    with open(DATA_FILE, 'w') as f:
-        json.dump(tasks, f, indent=2)
+def atomic_write_json(path, value, lines=False, before_replace=None):
+    """Write-then-rename so readers never see a half-written file.
 
+    With lines=True, value is a sequence of records written one per line (JSON Lines).
+    before_replace(tmp_path) runs once the new file is complete, before it goes live.
+    """
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        if lines:
+            f.write("".join(json.dumps(record) + "\n" for record in value))
+        else:
+            json.dump(value, f, indent=2)
+    if before_replace:
+        before_replace(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def append_json_lines(path, records):
+    """Append records one per line, creating the workspace folder on its first write"""
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(path, 'a') as f:
+        f.write("".join(json.dumps(record) + "\n" for record in records))
+
+
+def save_tasks(tasks, path=DATA_FILE):
+    # The snapshot is stamped with this payload's file before the rename, so a save
+    # from another thread landing in between leaves it stale, never wrongly current
+    snapshot = (lambda tmp_path: write_snapshot(tasks, path, os.stat(tmp_path))) if USE_SNAPSHOTS else None
+    atomic_write_json(path, tasks, before_replace=snapshot)
+
+
+def get_data_mtime(path=DATA_FILE):
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+
+def validate_template(name, template):
+    """Checked, normalised copy of a template; raises ValueError on bad fields"""
+    if not isinstance(name, str) or not name.strip() or len(name) > 60:
+        raise ValueError("name must be 1-60 characters")
+    if not isinstance(template, dict):
+        raise ValueError("template must be an object")
+    tasks = template.get('tasks')
+    if not isinstance(tasks, list) or not all(isinstance(t, str) and t.strip() for t in tasks):
+        raise ValueError("tasks must be a list of task names")
+    if not 1 <= len(tasks) <= TEMPLATE_MAX_TASKS:
+        raise ValueError(f"a template holds 1-{TEMPLATE_MAX_TASKS} tasks")
+    if template.get('priority') not in PRIORITY_ORDER:
+        raise ValueError(f"priority must be one of {', '.join(PRIORITY_ORDER)}")
+    if not isinstance(template.get('category'), str) or not template['category'].strip():
+        raise ValueError("category is required")
+    duration = template.get('duration')
+    if isinstance(duration, bool) or not isinstance(duration, (int, float)) or not 0 < duration <= TEMPLATE_MAX_HOURS:
+        raise ValueError(f"duration must be between 0 and {TEMPLATE_MAX_HOURS} hours")
+    return {"tasks": [t.strip() for t in tasks], "category": template['category'].strip(),
+            "priority": template['priority'], "duration": duration}
+
+
+class TemplateRegistry:
+    """A workspace's templates file, parsed and validated once per file version.
+
+    Broken entries are reported in `errors` and left out instead of hiding every
+    template; without a file the built-in defaults are used.
+    """
+
+    def __init__(self, path=TEMPLATES_FILE):
+        self.path = path
+        self.lock = threading.RLock()
+        self.templates = {}
+        self.errors = []
+        self._mtime = -1
+
+    def get(self):
+        mtime = get_data_mtime(self.path)
+        with self.lock:
+            if mtime != self._mtime:
+                self._load()
+                self._mtime = mtime
+            return self.templates
+
+    def _read_raw(self):
+        """The file's contents as written, invalid entries included; the defaults without a file"""
+        if not os.path.exists(self.path):
+            return get_default_templates()
+        with open(self.path, 'r') as f:
+            return json.load(f)
 
-def load_templates():
-    if os.path.exists(TEMPLATES_FILE):
+    def _load(self):
+        self.templates, self.errors = {}, []
         try:
-            with open(TEMPLATES_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return get_default_templates()
-    return get_default_templates()
+            raw = self._read_raw()
+        except ValueError as e:
+            self.errors.append(f"{self.path}: {e}")
+            raw = get_default_templates()
+        if not isinstance(raw, dict):
+            self.errors.append(f"{self.path}: expected an object of templates")
+            raw = {}
+        for name, template in raw.items():
+            try:
+                self.templates[name] = validate_template(name, template)
+            except ValueError as e:
+                self.errors.append(f"{name}: {e}")
+
+    def _edit_raw(self):
+        # Edits go into the file as written, so entries that fail validation are kept
+        raw = self._read_raw()
+        if not isinstance(raw, dict):
+            raise ValueError(f"{self.path} does not hold an object of templates")
+        return raw
+
+    def save(self, name, template, old_name=None):
+        template = validate_template(name, template)
+        with self.lock:
+            raw = self._edit_raw()
+            if old_name and old_name != name:
+                raw.pop(old_name, None)
+            raw[name] = template
+            atomic_write_json(self.path, raw)
+        return template
+
+    def delete(self, name):
+        with self.lock:
+            raw = self._edit_raw()
+            if raw.pop(name, None) is not None:
+                atomic_write_json(self.path, raw)
+
+
+def get_template_registry():
+    return get_workspace_registry().get(st.session_state.workspace).templates
+
+
+def load_templates():
+    return get_template_registry().get()
 
 
 def get_default_templates():
@@ -121,22 +361,93 @@ def get_default_templates():
 def export_data():
     return {
         "tasks": st.session_state.tasks,
-        "export_date": datetime.now().isoformat(),
+        "export_date": clock_now().isoformat(),
         "version": "2.0"
     }
 
 
 def import_data(data):
+    if isinstance(data, dict) and 'tasks' in data:
+        return import_records(data['tasks'])
+    if isinstance(data, list):
+        return import_records(data)
+    return False, "Invalid data format"
+
+
+def import_records(records):
+    """Replace all tasks; records may be in either the Python or the JS app format"""
     try:
-        if isinstance(data, dict) and 'tasks' in data:
-            st.session_state.tasks = data['tasks']
-            save_tasks(st.session_state.tasks)
-            return True, f"✅ Imported {len(data['tasks'])} tasks!"
-        return False, "Invalid data format"
+        tasks = [to_python_task(record) for record in records]
+        if not tasks:
+            return False, "No tasks found - nothing was imported"
+        new_ids = {t['id'] for t in tasks}
+        dropped = [t['id'] for t in st.session_state.tasks if t['id'] not in new_ids]
+        replaced = st.session_state.tasks
+        st.session_state.tasks = tasks
+        commit_tasks(upserts=st.session_state.tasks, deletes=dropped)
+        reset_indexes()
+        old_ids = {t['id'] for t in replaced}
+        log_operation(f"Import {len(tasks)} tasks",
+                      redo=([dict(t) for t in tasks], dropped),
+                      undo=(replaced, [t['id'] for t in tasks if t['id'] not in old_ids]))
+        return True, f"✅ Imported {len(tasks)} tasks!"
     except Exception as e:
         return False, f"Import failed: {str(e)}"
 
 
+def import_calendar(lines):
+    """Merge events from an .ics stream into the tasks; returns (created, updated).
+
+    Events carry stable ids (from their UID), so importing the same calendar
+    again updates the tasks it created instead of duplicating them. Events are
+    matched against the tasks as they stream in, keeping only the new and
+    changed tasks, and nothing is applied until the whole calendar has been
+    read; then it is one feed record, one save and one undo step.
+    """
+    tasks = st.session_state.tasks
+    positions = {t['id']: i for i, t in enumerate(tasks)}
+    changes, created = {}, {}
+    for event_task in iter_ics_tasks(lines, clock_now()):
+        i = positions.get(event_task['id'])
+        if i is None:
+            created[event_task['id']] = event_task  # a repeated UID keeps its last version
+            continue
+        old = tasks[i]
+        updated = {**old, **event_task, 'added_at': old.get('added_at', event_task['added_at'])}
+        if old.get('status') == 'completed':
+            # A calendar can't un-complete a task, and it doesn't know when it was completed
+            updated['status'] = 'completed'
+            updated.pop('completed_at', None)
+            if 'completed_at' in old:
+                updated['completed_at'] = old['completed_at']
+        if updated != old:
+            changes[i] = updated
+        else:
+            changes.pop(i, None)
+    if not (changes or created):
+        return 0, 0
+    before = [tasks[i] for i in changes]
+    for i, updated in changes.items():
+        tasks[i] = updated
+    created = list(created.values())
+    tasks.extend(created)
+    upserts = list(changes.values()) + created
+    created_ids = [t['id'] for t in created]
+    commit_tasks(upserts=upserts)
+    reset_indexes()
+    log_operation(f"Import calendar ({len(upserts)} events)",
+                  redo=([dict(t) for t in upserts], []), undo=(before, created_ids))
+    return len(created_ids), len(upserts) - len(created_ids)
+
+
+def export_calendar(tasks):
+    """Stream tasks as an .ics calendar into a temp file; returns (path, events written)"""
+    fd, path = tempfile.mkstemp(prefix="tusk_", suffix=".ics")
+    with open(fd, 'w', encoding='utf-8', newline='') as f:
+        count = write_ics(tasks, f)
+    return path, count
+
+
 # ============================================================
 # SECTION 5: HELPER FUNCTIONS
 # ============================================================
@@ -144,49 +455,132 @@ def get_category_color(category):
     return CATEGORY_COLORS.get(category, '#6b7280')
 
 
-def is_task_active(task):
-    task_datetime = datetime.strptime(f"{task['scheduled_date']} {task['start_time']}", "%Y-%m-%d %H:%M")
-    return task_datetime <= datetime.now()
+class SystemClock:
+    def now(self):
+        return datetime.now()
+
+    def seconds_until(self, moment):
+        return (moment - self.now()).total_seconds()
+
+
+class SimulatedClock:
+    """Clock starting at a given moment and running speed times faster than real time.
+
+    With speed 0 it stands still until advance() is called, so a benchmark can
+    step through days of scheduling activity as fast as it likes.
+    """
+
+    def __init__(self, start, speed=0.0):
+        self.start = start
+        self.speed = speed
+        self._real_start = datetime.now()
+        self.on_advance = []     # callbacks run after advance(), e.g. to wake the reminder scheduler
+
+    def now(self):
+        return self.start + (datetime.now() - self._real_start) * self.speed
+
+    def seconds_until(self, moment):
+        """Real seconds until the clock reaches moment; None while it stands still"""
+        if not self.speed:
+            return None
+        return (moment - self.now()).total_seconds() / self.speed
+
+    def advance(self, delta):
+        self.start += delta
+        for callback in self.on_advance:
+            callback()
 
 
-def is_task_future(task):
-    task_datetime = datetime.strptime(f"{task['scheduled_date']} {task['start_time']}", "%Y-%m-%d %H:%M")
-    return task_datetime > datetime.now()
+@st.cache_resource
+def get_process_clock():
+    """The clock shared by background jobs and new sessions, simulated with TUSK_SIMULATED_START"""
+    if SIMULATED_START:
+        return SimulatedClock(datetime.fromisoformat(SIMULATED_START), CLOCK_SPEED)
+    return SystemClock()
 
 
-def is_task_overdue(task):
-    task_end = datetime.strptime(f"{task['scheduled_date']} {task['end_time']}", "%Y-%m-%d %H:%M")
-    return task_end < datetime.now()
+def get_clock():
+    """The session's clock; swap st.session_state.clock to simulate time for one session"""
+    if st.session_state.get('clock') is None:
+        st.session_state.clock = get_process_clock()
+    return st.session_state.clock
+
+
+def tick_clock():
+    """Snapshot the clock once per rerun so every task is classified against the same moment"""
+    st.session_state.now = get_clock().now()
+    return st.session_state.now
+
+
+def clock_now():
+    return st.session_state.get('now') or tick_clock()
+
+
+def clock_today():
+    return clock_now().date()
 
 
 def get_pomodoro_time_remaining():
     if st.session_state.pomodoro_active and st.session_state.pomodoro_start_time:
-        elapsed = (datetime.now() - st.session_state.pomodoro_start_time).total_seconds() / 60
+        elapsed = (clock_now() - st.session_state.pomodoro_start_time).total_seconds() / 60
         return max(0, st.session_state.pomodoro_duration - elapsed)
     return 0
 
 
-def search_tasks(tasks, query):
-    """Case-insensitive search in task name and category"""
-    if not query:
-        return tasks
-    query_lower = query.lower()
-    return [t for t in tasks if 
-            query_lower in t['task'].lower() or 
-            query_lower in t.get('category', 'General').lower()]
+@st.cache_resource
+def load_gifs():
+    """GIF manifest plus the bytes of every bundled GIF, read once per process"""
+    with open(os.path.join(ASSETS_DIR, "manifest.json"), encoding="utf-8") as f:
+        gifs = json.load(f)['gifs']
+    bundle_file = os.path.join(GIFS_DIR, "bundle.json")
+    bundled = {}
+    if os.path.exists(bundle_file):
+        with open(bundle_file, encoding="utf-8") as f:
+            bundled = json.load(f)
+    images = {}
+    for key, name in bundled.items():
+        path = os.path.join(GIFS_DIR, name)
+        if key in gifs and os.path.exists(path):
+            with open(path, 'rb') as f:
+                images[key] = f.read()
+    return gifs, images
+
+
+@st.cache_resource
+def load_stylesheet():
+    """assets/tusk.css, minified once per process"""
+    with open(os.path.join(ASSETS_DIR, "tusk.css"), encoding="utf-8") as f:
+        css = f.read()
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    return f"<style>{css.strip()}</style>"
+
+
+def show_gif(key, width=300):
+    # Bundled bytes are served by Streamlit's media endpoint under a content-hash URL;
+    # a GIF that has not been bundled is shown as its emoji, never fetched remotely
+    gifs, images = load_gifs()
+    if LITE_ASSETS or key not in images:
+        st.markdown(f"<div style='font-size: 5rem; text-align: center;'>{gifs[key]['lite']}</div>",
+                    unsafe_allow_html=True)
+    else:
+        st.image(images[key], width=width)
 
 
 # ============================================================
 # SECTION 6: NATURAL LANGUAGE PARSER
 # ============================================================
 def parse_natural_language(text):
+    now = clock_now()
+    today = now.date()
     parsed = {
         'task': text,
         'priority': 'Medium',
         'category': 'General',
-        'scheduled_date': date.today(),
-        'start_time': datetime.now().time(),
-        'end_time': (datetime.now() + timedelta(hours=1)).time()
+        'scheduled_date': today,
+        'start_time': now.time(),
+        'end_time': (now + timedelta(hours=1)).time()
     }
     
     text_lower = text.lower()
@@ -214,23 +608,23 @@ def parse_natural_language(text):
             elif time_match.group(3) == 'am' and hour == 12:
                 hour = 0
         parsed['start_time'] = time(hour % 24, minute)
-        parsed['end_time'] = (datetime.combine(date.today(), parsed['start_time']) + timedelta(hours=1)).time()
+        parsed['end_time'] = (datetime.combine(today, parsed['start_time']) + timedelta(hours=1)).time()
     
     # Date detection
     if 'tomorrow' in text_lower:
-        parsed['scheduled_date'] = date.today() + timedelta(days=1)
+        parsed['scheduled_date'] = today + timedelta(days=1)
     elif 'today' in text_lower:
-        parsed['scheduled_date'] = date.today()
+        parsed['scheduled_date'] = today
     else:
         days_match = re.search(r'\bin\s*(\d+)\s*days?\b', text_lower)
         if days_match:
-            parsed['scheduled_date'] = date.today() + timedelta(days=int(days_match.group(1)))
+            parsed['scheduled_date'] = today + timedelta(days=int(days_match.group(1)))
     
     # Duration detection
     duration_match = re.search(r'\bfor\s*(\d+)\s*(?:hours?|hrs?|h)\b', text_lower)
     if duration_match:
         hours = int(duration_match.group(1))
-        parsed['end_time'] = (datetime.combine(date.today(), parsed['start_time']) + timedelta(hours=hours)).time()
+        parsed['end_time'] = (datetime.combine(today, parsed['start_time']) + timedelta(hours=hours)).time()
     
     # Clean task text
     clean_text = text
@@ -251,47 +645,72 @@ def parse_natural_language(text):
 # ============================================================
 # SECTION 7: TASK CRUD FUNCTIONS
 # ============================================================
+def make_task(task_name, priority, category, scheduled_date, start_time, end_time, now=None):
+    """New pending task record; date and times are already-formatted strings"""
+    now = now or get_process_clock().now()  # also called from API threads, outside any session
+    return {
+        "id": str(uuid.uuid4()),
+        "task": task_name,
+        "priority": priority,
+        "category": category,
+        "status": "pending",
+        "added_at": now.strftime("%Y-%m-%d %H:%M"),
+        "scheduled_date": scheduled_date,
+        "start_time": start_time,
+        "end_time": end_time,
+    }
+
+
 def add_task(task_name, priority, category, scheduled_date, start_time, end_time):
     if task_name:
-        new_task = {
-            "id": str(uuid.uuid4()),
-            "task": task_name,
-            "priority": priority,
-            "category": category,
-            "status": "pending",
-            "added_at": datetime.now().strftime("%Y-%m-%d %H:%M"),
-            "scheduled_date": scheduled_date.isoformat(),
-            "start_time": start_time.strftime("%H:%M"),
-            "end_time": end_time.strftime("%H:%M"),
-        }
+        new_task = make_task(task_name, priority, category, scheduled_date.isoformat(),
+                             start_time.strftime("%H:%M"), end_time.strftime("%H:%M"), clock_now())
+        conflicts = find_conflicts(scheduled_date, start_time, end_time)
         st.session_state.tasks.append(new_task)
-        save_tasks(st.session_state.tasks)
+        commit_tasks(upserts=[new_task])
+        index_task(new_task)
+        log_operation(f"Add '{task_name}'", redo=([dict(new_task)], []), undo=([], [new_task['id']]))
         st.toast(f"✅ Added: {task_name}")
+        warn_conflicts(conflicts)
+        return new_task
 
 
 def complete_task(task_id):
     for task in st.session_state.tasks:
         if task['id'] == task_id:
+            before = dict(task)
             task['status'] = 'completed'
-            task['completed_at'] = datetime.now().strftime("%Y-%m-%d %H:%M")
-            save_tasks(st.session_state.tasks)
+            task['completed_at'] = clock_now().strftime("%Y-%m-%d %H:%M")
+            commit_tasks(upserts=[task])
+            index_task(task)
+            log_operation(f"Complete '{task['task']}'", redo=([dict(task)], []), undo=([before], []))
             st.balloons()
             st.toast("🎉 Task completed!")
             break
 
 
 def delete_task(task_id):
+    removed = [t for t in st.session_state.tasks if t['id'] == task_id]
     st.session_state.tasks = [t for t in st.session_state.tasks if t['id'] != task_id]
-    save_tasks(st.session_state.tasks)
+    commit_tasks(deletes=[task_id])
+    unindex_task(task_id)
+    if removed:
+        log_operation(f"Delete '{removed[0]['task']}'", redo=([], [task_id]), undo=(removed, []))
     st.toast("🗑️ Task deleted")
 
 
 def update_task(task_id, updates):
     for task in st.session_state.tasks:
         if task['id'] == task_id:
+            before = dict(task)
             task.update(updates)
-            save_tasks(st.session_state.tasks)
+            commit_tasks(upserts=[task])
+            index_task(task)
+            log_operation(f"Edit '{task['task']}'", redo=([dict(task)], []), undo=([before], []))
             st.toast("✏️ Task updated")
+            if task['status'] == 'pending':
+                start, end = get_task_interval(task)
+                warn_conflicts(get_interval_index().overlaps(start, end, task_id))
             break
 
 
@@ -299,19 +718,190 @@ def create_tasks_from_template(template_name, templates, scheduled_date):
     if template_name not in templates:
         return 0
     template = templates[template_name]
-    created_count = 0
-    start_time = datetime.now()
-    for i, task_text in enumerate(template['tasks']):
-        task_start = start_time + timedelta(hours=i * template['duration'])
-        task_end = task_start + timedelta(hours=template['duration'])
-        add_task(task_text, template['priority'], template['category'],
-                scheduled_date, task_start.time(), task_end.time())
-        created_count += 1
-    return created_count
+    items = [{'task': task_text, 'priority': template['priority'], 'category': template['category'],
+              'duration': template['duration']} for task_text in template['tasks']]
+    now = clock_now()
+    placed, unplaced = pack_tasks(items, scheduled_date, not_before=now)
+    # One batch: a single feed record, save and undo step for the whole template
+    new_tasks = [make_task(item['task'], item['priority'], item['category'], task_start.date().isoformat(),
+                           task_start.strftime("%H:%M"), task_end.strftime("%H:%M"), now)
+                 for item, task_start, task_end in placed]
+    if new_tasks:
+        st.session_state.tasks.extend(new_tasks)
+        commit_tasks(upserts=new_tasks)
+        for task in new_tasks:
+            index_task(task)
+        log_operation(f"Template '{template_name}'", redo=([dict(t) for t in new_tasks], []),
+                      undo=([], [t['id'] for t in new_tasks]))
+    if unplaced:
+        st.warning(f"No free slot this week for: {', '.join(item['task'] for item in unplaced)}")
+    return len(placed)
 
 
 # ============================================================
-# SECTION 8: ANALYTICS FUNCTIONS
+# SECTION 8: UNDO / REDO
+# ============================================================
+class OperationLog:
+    """Bounded undo/redo history of inverse operations.
+
+    An operation is (label, redo, undo), where redo and undo are change sets of
+    (records to upsert, ids to delete) holding only the tasks it touched. Records
+    that left the task list are kept by reference and copied only when an undo
+    puts them back, so undoing a 10k-task clear needs no snapshot of the list.
+    The oldest operations are dropped beyond UNDO_LIMIT operations or
+    UNDO_MAX_RECORDS logged records. With a path, every push/undo/redo is
+    appended there and replayed on load.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self._records = 0
+        self._lines = 0
+        if path and os.path.exists(path):
+            self._replay()
+
+    @staticmethod
+    def _size(op):
+        _, (redo_upserts, redo_deletes), (undo_upserts, undo_deletes) = op
+        return len(redo_upserts) + len(redo_deletes) + len(undo_upserts) + len(undo_deletes)
+
+    def _replay(self):
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn write at the tail
+                if 'push' in entry:
+                    label, redo, undo = entry['push']
+                    self._push((label, tuple(redo), tuple(undo)))
+                elif 'undo' in entry:
+                    self._move(self.undo_stack, self.redo_stack)
+                elif 'redo' in entry:
+                    self._move(self.redo_stack, self.undo_stack)
+        self._rewrite()
+
+    def _append(self, entry):
+        if not self.path:
+            return
+        append_json_lines(self.path, [entry])
+        self._lines += 1
+        if self._lines > 4 * UNDO_LIMIT:
+            self._rewrite()
+
+    def _rewrite(self):
+        """Compact the file down to pushes that rebuild the current stacks"""
+        ops = list(self.undo_stack) + self.redo_stack[::-1]
+        entries = [{"push": op} for op in ops] + [{"undo": 1}] * len(self.redo_stack)
+        atomic_write_json(self.path, entries, lines=True)
+        self._lines = len(entries)
+
+    def _push(self, op):
+        self.undo_stack.append(op)
+        self._records += self._size(op)
+        while self.redo_stack:
+            self._records -= self._size(self.redo_stack.pop())
+        while len(self.undo_stack) > UNDO_LIMIT or \
+                (self._records > UNDO_MAX_RECORDS and len(self.undo_stack) > 1):
+            self._records -= self._size(self.undo_stack.popleft())
+
+    def _move(self, source, target):
+        if not source:
+            return None
+        op = source.pop()
+        target.append(op)
+        return op
+
+    def push(self, label, redo, undo):
+        self._push((label, redo, undo))
+        self._append({"push": (label, redo, undo)})
+
+    def undo(self):
+        op = self._move(self.undo_stack, self.redo_stack)
+        if op:
+            self._append({"undo": 1})
+        return op
+
+    def redo(self):
+        op = self._move(self.redo_stack, self.undo_stack)
+        if op:
+            self._append({"redo": 1})
+        return op
+
+
+def prune_undo_logs(workspace, keep_days=UNDO_KEEP_DAYS):
+    folder = os.path.dirname(workspace_file(workspace, DATA_FILE)) or "."
+    prefix, suffix = UNDO_FILE.split("{}")
+    cutoff = (datetime.now() - timedelta(days=keep_days)).timestamp()
+    for name in os.listdir(folder) if os.path.isdir(folder) else ():
+        path = os.path.join(folder, name)
+        if name.startswith(prefix) and name.endswith(suffix) and os.path.getmtime(path) < cutoff:
+            os.remove(path)
+
+
+def undo_history_id():
+    """This tab's undo history id, kept in ?history= so a reload finds the same log"""
+    history = st.query_params.get('history')
+    if history is None or not WORKSPACE_NAME_PATTERN.fullmatch(history):
+        history = secrets.token_hex(8)
+        st.query_params['history'] = history
+        prune_undo_logs(st.session_state.workspace)
+    return history
+
+
+def get_op_log():
+    if st.session_state.get('op_log') is None:
+        # One log per tab: sessions sharing a file would compact away each other's history
+        path = workspace_file(st.session_state.workspace, UNDO_FILE.format(undo_history_id())) \
+            if PERSIST_UNDO else None
+        st.session_state.op_log = OperationLog(path)
+    return st.session_state.op_log
+
+
+def log_operation(label, redo, undo):
+    get_op_log().push(label, redo, undo)
+
+
+def apply_change_set(change_set):
+    """Upsert/delete tasks in the session as one batch: one feed record and one save"""
+    upserts, deletes = change_set
+    upserts = [dict(t) for t in upserts]
+    doomed = set(deletes)
+    replacements = {t['id']: t for t in upserts}
+    tasks = [t for t in st.session_state.tasks if t['id'] not in doomed]
+    for i, task in enumerate(tasks):
+        if task['id'] in replacements:
+            tasks[i] = replacements.pop(task['id'])
+    tasks.extend(replacements.values())
+    st.session_state.tasks = tasks
+    commit_tasks(upserts=upserts, deletes=deletes)
+    if len(upserts) + len(deletes) > TASK_PAGE_SIZE:
+        reset_indexes()
+    else:
+        for task_id in deletes:
+            unindex_task(task_id)
+        for task in upserts:
+            index_task(task)
+
+
+def undo_last():
+    op = get_op_log().undo()
+    if op:
+        apply_change_set(op[2])
+        st.toast(f"↩️ Undone: {op[0]}")
+
+
+def redo_last():
+    op = get_op_log().redo()
+    if op:
+        apply_change_set(op[1])
+        st.toast(f"↪️ Redone: {op[0]}")
+
+
+# ============================================================
+# SECTION 9: ANALYTICS FUNCTIONS
 # ============================================================
 def calculate_analytics(tasks):
     if not tasks:
@@ -347,10 +937,1621 @@ def calculate_analytics(tasks):
 
 
 # ============================================================
-# SECTION 9: SESSION STATE INITIALIZATION
+# SECTION 10: FOCUS LOG
+# ============================================================
+class FocusLog:
+    """Append-only log of pomodoro focus sessions with running totals.
+
+    Lines are {"ev": "start", "at", "id", "plan"} or {"ev": "stop", "at", "min"}.
+    Totals are folded in as lines are read, and refresh() only reads what was
+    appended since the last call, so reports stay cheap however long the log
+    grows. A start without a stop is the timer that is still running.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self._offset = 0
+        self.open_session = None
+        self.sessions = 0
+        self.minutes_by_task = defaultdict(float)
+        self.minutes_by_day = defaultdict(float)
+        self.refresh()
+
+    def refresh(self):
+        with self.lock:
+            if not os.path.exists(self.path):
+                return
+            with open(self.path, 'rb') as f:
+                f.seek(self._offset)
+                data = f.read()
+            end = data.rfind(b"\n") + 1  # a torn last line is read next time
+            self._offset += end
+            for line in data[:end].splitlines():
+                try:
+                    self._fold(json.loads(line))
+                except (ValueError, KeyError, TypeError):
+                    pass
+
+    def _fold(self, event):
+        if event['ev'] == 'start':
+            self.open_session = event
+        elif event['ev'] == 'stop' and self.open_session:
+            self.minutes_by_task[self.open_session['id']] += event['min']
+            self.minutes_by_day[self.open_session['at'][:10]] += event['min']
+            self.sessions += 1
+            self.open_session = None
+
+    def _append(self, event):
+        append_json_lines(self.path, [event])
+        self.refresh()
+
+    def start(self, task_id, planned_minutes, now):
+        with self.lock:
+            self.refresh()
+            if self.open_session:
+                self.stop(now)
+            self._append({"ev": "start", "at": now.isoformat(timespec="seconds"),
+                          "id": task_id, "plan": planned_minutes})
+
+    def stop(self, now):
+        """Close the running session, counting at most its planned length; returns the minutes logged"""
+        with self.lock:
+            self.refresh()
+            if not self.open_session:
+                return 0
+            elapsed = (now - datetime.fromisoformat(self.open_session['at'])).total_seconds() / 60
+            minutes = round(max(0, min(elapsed, self.open_session['plan'])), 1)
+            self._append({"ev": "stop", "at": now.isoformat(timespec="seconds"), "min": minutes})
+            return minutes
+
+
+def get_focus_log():
+    focus = get_workspace_registry().get(st.session_state.workspace).focus
+    focus.refresh()
+    return focus
+
+
+def planned_minutes(task):
+    start_h, start_m = task['start_time'].split(":")
+    end_h, end_m = task['end_time'].split(":")
+    return (int(end_h) * 60 + int(end_m) - int(start_h) * 60 - int(start_m)) % (24 * 60)
+
+
+def focus_report(tasks, focus, limit=20):
+    """Planned vs focused minutes for the tasks with the most logged focus"""
+    logged = focus.minutes_by_task
+    by_id = {t['id']: t for t in tasks if t['id'] in logged}
+    rows = []
+    for task_id, minutes in sorted(logged.items(), key=lambda item: -item[1])[:limit]:
+        task = by_id.get(task_id)
+        planned = planned_minutes(task) if task else None
+        rows.append({
+            "Task": task['task'] if task else ("(no task)" if task_id is None else "(deleted task)"),
+            "Planned (min)": planned,
+            "Focused (min)": round(minutes),
+            "Focus / plan": f"{round(minutes / planned * 100)}%" if planned else "-",
+        })
+    return rows
+
+
+# ============================================================
+# SECTION 11: SCHEDULE CONFLICT INDEX
+# ============================================================
+def get_task_interval(task):
+    """Start/end datetimes of a task; an end at or before the start rolls into the next day"""
+    start = datetime.fromisoformat(f"{task['scheduled_date']}T{task['start_time']}")
+    end = datetime.fromisoformat(f"{task['scheduled_date']}T{task['end_time']}")
+    if end <= start:
+        end += timedelta(days=1)
+    return start, end
+
+
+class IntervalIndex:
+    """Pending task time ranges kept sorted by start for O(log N + k) overlap lookups.
+
+    Any interval overlapping [start, end) must begin in (start - max_span, end),
+    so a lookup is two bisects plus a scan of that window.
+    """
+
+    def __init__(self, tasks=()):
+        self._tasks = {}
+        self._entries = []
+        self._max_span = timedelta(0)
+        for task in tasks:
+            if task.get('status') == 'pending':
+                self._store(task)
+        self._entries.sort()
+
+    def _store(self, task):
+        try:
+            start, end = get_task_interval(task)
+        except (KeyError, ValueError):
+            return None
+        self._tasks[task['id']] = (start, end, task)
+        self._max_span = max(self._max_span, end - start)
+        entry = (start, end, task['id'])
+        self._entries.append(entry)
+        return entry
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def add(self, task):
+        self.remove(task['id'])
+        if task.get('status') != 'pending':
+            return
+        entry = self._store(task)
+        if entry:
+            self._entries.pop()
+            bisect.insort(self._entries, entry)
+
+    def remove(self, task_id):
+        stored = self._tasks.pop(task_id, None)
+        if stored:
+            entry = (stored[0], stored[1], task_id)
+            i = bisect.bisect_left(self._entries, entry)
+            if i < len(self._entries) and self._entries[i] == entry:
+                del self._entries[i]
+
+    def overlaps(self, start, end, exclude_id=None):
+        lo = bisect.bisect_right(self._entries, (start - self._max_span,))
+        hi = bisect.bisect_left(self._entries, (end,))
+        return [self._tasks[tid][2] for s, e, tid in self._entries[lo:hi]
+                if e > start and tid != exclude_id]
+
+    def day_conflicts(self, day):
+        """All overlapping task pairs touching the given day, found with one sweep"""
+        day_start = datetime.combine(day, time(0, 0))
+        day_end = day_start + timedelta(days=1)
+        lo = bisect.bisect_right(self._entries, (day_start - self._max_span,))
+        hi = bisect.bisect_left(self._entries, (day_end,))
+        conflicts, open_ends = [], []
+        for start, end, tid in self._entries[lo:hi]:
+            if end <= day_start:
+                continue
+            while open_ends and open_ends[0][0] <= start:
+                heapq.heappop(open_ends)
+            for _, other_id in open_ends:
+                conflicts.append((self._tasks[other_id][2], self._tasks[tid][2]))
+            heapq.heappush(open_ends, (end, tid))
+        return conflicts
+
+
+def get_interval_index():
+    if st.session_state.get('interval_index') is None:
+        st.session_state.interval_index = IntervalIndex(st.session_state.tasks)
+    return st.session_state.interval_index
+
+
+def index_task(task):
+    get_interval_index().add(task)
+    get_query_index().add(task)
+    get_sorted_views().add(task)
+    get_task_ranker().add(task)
+
+
+def unindex_task(task_id):
+    get_interval_index().remove(task_id)
+    get_query_index().remove(task_id)
+    get_sorted_views().remove(task_id)
+    get_task_ranker().remove(task_id)
+
+
+def reset_indexes():
+    st.session_state.interval_index = None
+    st.session_state.query_index = None
+    st.session_state.sorted_views = None
+    st.session_state.task_ranker = None
+
+
+def find_conflicts(scheduled_date, start_time, end_time, exclude_id=None):
+    start = datetime.combine(scheduled_date, start_time)
+    end = datetime.combine(scheduled_date, end_time)
+    if end <= start:
+        end += timedelta(days=1)
+    return get_interval_index().overlaps(start, end, exclude_id)
+
+
+def warn_conflicts(conflicts):
+    if conflicts:
+        names = ", ".join(t['task'] for t in conflicts[:3])
+        more = f" (+{len(conflicts) - 3} more)" if len(conflicts) > 3 else ""
+        st.toast(f"⚠️ Overlaps with: {names}{more}")
+
+
+# ============================================================
+# SECTION 12: FILTER QUERY LANGUAGE
 # ============================================================
+# Tokens: quoted phrase | key:[op]value | bare word
+QUERY_TOKEN = re.compile(r'"([^"]*)"|(\w+):(<=|>=|<|>|=)?("[^"]*"|\S+)|(\S+)')
+QUERY_KEYS = {'priority', 'category', 'status', 'due', 'overdue'}
+STATUS_ALIASES = {'pending': 'pending', 'open': 'pending', 'todo': 'pending',
+                  'completed': 'completed', 'done': 'completed'}
+
+
+def parse_query_date(value, today):
+    relative = {'today': 0, 'tomorrow': 1, 'yesterday': -1}
+    if value in relative:
+        return (today + timedelta(days=relative[value])).isoformat()
+    days_match = re.fullmatch(r'([+-]?\d+)d', value)
+    if days_match:
+        return (today + timedelta(days=int(days_match.group(1)))).isoformat()
+    return date.fromisoformat(value).isoformat()
+
+
+class QueryPlan:
+    """A filter query compiled once into per-field constraints.
+
+    Field constraints that an index can answer (status, category, priority,
+    due-date range) are kept separately from the residual predicates (overdue,
+    free text) so run_query can start from the smallest index bucket.
+    """
+
+    def __init__(self):
+        self.fields = {}      # 'status' / 'category' / 'priority' -> set of lowercase values
+        self.date_lo = None   # (iso date, inclusive)
+        self.date_hi = None
+        self.overdue = None
+        self.text_terms = []
+
+    def narrow_dates(self, op, value):
+        if op in ('>', '>=', '=') and (self.date_lo is None or value >= self.date_lo[0]):
+            self.date_lo = (value, op != '>')
+        if op in ('<', '<=', '=') and (self.date_hi is None or value <= self.date_hi[0]):
+            self.date_hi = (value, op != '<')
+
+    def matches(self, task, now, today_iso):
+        for field, allowed in self.fields.items():
+            if str(task.get(field, 'General' if field == 'category' else '')).lower() not in allowed:
+                return False
+        scheduled = task.get('scheduled_date', '')
+        if self.date_lo and not (scheduled > self.date_lo[0] or (self.date_lo[1] and scheduled == self.date_lo[0])):
+            return False
+        if self.date_hi and not (scheduled < self.date_hi[0] or (self.date_hi[1] and scheduled == self.date_hi[0])):
+            return False
+        if self.overdue is not None:
+            overdue = (task['status'] == 'pending' and scheduled <= today_iso
+                       and get_task_interval(task)[1] < now)
+            if overdue != self.overdue:
+                return False
+        if self.text_terms:
+            haystack = f"{task['task']}\n{task.get('category', 'General')}".lower()
+            if not all(term in haystack for term in self.text_terms):
+                return False
+        return True
+
+
+@functools.lru_cache(maxsize=128)
+def compile_query(text, today):
+    """Parse a filter query such as
+    'priority:high category:work due:<=tomorrow status:pending overdue:true "client call"'
+    """
+    plan = QueryPlan()
+    loose_words = []
+    for phrase, key, op, value, word in QUERY_TOKEN.findall(text):
+        key = key.lower()
+        if key and key not in QUERY_KEYS:
+            word = f"{key}:{op}{value}"
+        if word:
+            loose_words.append(word)
+            continue
+        if phrase:
+            plan.text_terms.append(phrase.lower())
+            continue
+        value = value.strip('"').lower()
+        if key == 'due':
+            plan.narrow_dates(op or '=', parse_query_date(value, today))
+        elif op:
+            raise ValueError(f"'{key}' does not take a comparison")
+        elif key == 'overdue':
+            if value not in ('true', 'false', 'yes', 'no'):
+                raise ValueError(f"overdue must be true or false, not '{value}'")
+            plan.overdue = value in ('true', 'yes')
+        else:
+            values = set(value.split(','))
+            if key == 'status':
+                unknown = values - STATUS_ALIASES.keys()
+                if unknown:
+                    raise ValueError(f"unknown status '{unknown.pop()}'")
+                values = {STATUS_ALIASES[v] for v in values}
+            plan.fields[key] = plan.fields[key] & values if key in plan.fields else values
+    if plan.overdue:
+        plan.fields['status'] = plan.fields.get('status', {'pending'}) & {'pending'}
+        plan.narrow_dates('<=', today.isoformat())
+    if loose_words:
+        # Unstructured words keep the old search box's whole-phrase substring behaviour
+        plan.text_terms.append(' '.join(loose_words).lower())
+    return plan
+
+
+class TaskQueryIndex:
+    """Secondary indexes over status, category, priority and scheduled date"""
+
+    FIELDS = ('status', 'category', 'priority')
+
+    def __init__(self, tasks=()):
+        self._tasks = {}
+        self._keys = {}
+        self._buckets = {field: defaultdict(dict) for field in self.FIELDS}
+        self._dates = []
+        for task in tasks:
+            self._store(task)
+        self._dates.sort()
+
+    def _store(self, task):
+        # Keys are kept because callers update the task dict in place before re-indexing it
+        keys = tuple(str(task.get(f, 'General' if f == 'category' else '')).lower() for f in self.FIELDS)
+        entry = (task.get('scheduled_date', ''), task['id'])
+        self._tasks[task['id']] = task
+        self._keys[task['id']] = (keys, entry)
+        for field, key in zip(self.FIELDS, keys):
+            self._buckets[field][key][task['id']] = task
+        self._dates.append(entry)
+        return entry
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def add(self, task):
+        self.remove(task['id'])
+        entry = self._store(task)
+        self._dates.pop()
+        bisect.insort(self._dates, entry)
+
+    def remove(self, task_id):
+        if self._tasks.pop(task_id, None) is None:
+            return
+        keys, entry = self._keys.pop(task_id)
+        for field, key in zip(self.FIELDS, keys):
+            del self._buckets[field][key][task_id]
+        i = bisect.bisect_left(self._dates, entry)
+        if i < len(self._dates) and self._dates[i] == entry:
+            del self._dates[i]
+
+    def bucket_size(self, field, values):
+        return sum(len(self._buckets[field].get(v, ())) for v in values)
+
+    def bucket_tasks(self, field, values):
+        for v in values:
+            yield from self._buckets[field].get(v, {}).values()
+
+    def date_slice(self, date_lo, date_hi):
+        lo = 0 if date_lo is None else (
+            bisect.bisect_left(self._dates, (date_lo[0],)) if date_lo[1]
+            else bisect.bisect_left(self._dates, (date_lo[0] + '\x00',)))
+        hi = len(self._dates) if date_hi is None else (
+            bisect.bisect_left(self._dates, (date_hi[0] + '\x00',)) if date_hi[1]
+            else bisect.bisect_left(self._dates, (date_hi[0],)))
+        return lo, max(lo, hi)
+
+    def date_tasks(self, lo, hi):
+        return (self._tasks[tid] for _, tid in self._dates[lo:hi])
+
+
+def get_query_index():
+    if st.session_state.get('query_index') is None:
+        st.session_state.query_index = TaskQueryIndex(st.session_state.tasks)
+    return st.session_state.query_index
+
+
+def run_query(plan, index=None, tasks=None, now=None):
+    """Evaluate a plan starting from its most selective index, then filter the rest"""
+    if index is None:
+        index = get_query_index()
+    # An index only pays off when it rules out at least half the tasks
+    best_size, candidates = len(index) // 2, None
+    for field, values in plan.fields.items():
+        size = index.bucket_size(field, values)
+        if size < best_size:
+            best_size, candidates = size, (lambda f=field, v=values: index.bucket_tasks(f, v))
+    if plan.date_lo or plan.date_hi:
+        lo, hi = index.date_slice(plan.date_lo, plan.date_hi)
+        if hi - lo < best_size:
+            best_size, candidates = hi - lo, (lambda: index.date_tasks(lo, hi))
+    if candidates is None:
+        source = st.session_state.tasks if tasks is None else tasks
+    else:
+        source = candidates()
+    now = now or clock_now()
+    today_iso = now.date().isoformat()
+    return [t for t in source if plan.matches(t, now, today_iso)]
+
+
+def filter_tasks(tasks, query, now=None):
+    """Apply a filter query to any task list by scanning it (no session index needed)"""
+    now = now or get_process_clock().now()
+    plan = compile_query(query, now.date())
+    today_iso = now.date().isoformat()
+    return [t for t in tasks if plan.matches(t, now, today_iso)]
+
+
+# ============================================================
+# SECTION 13: SORTED TAB VIEWS
+# ============================================================
+class SortedTaskViews:
+    """Tab orderings kept sorted as tasks change, so reruns never sort.
+
+    Pending tasks are ordered by start time: Active is the prefix that has
+    started, Upcoming the rest. Completed tasks are ordered by completed_at.
+    Each mutation is an O(log N) bisect plus a list insert/delete.
+    """
+
+    def __init__(self, tasks=()):
+        self._pending = []   # (start, task_id)
+        self._done = []      # (completed_at, task_id)
+        self._entries = {}   # task_id -> (list, entry, end, task)
+        for task in tasks:
+            self._store(task)
+        self._pending.sort()
+        self._done.sort()
+
+    def _store(self, task):
+        if task.get('status') == 'pending':
+            try:
+                start, end = get_task_interval(task)
+            except (KeyError, ValueError):
+                return None
+            target, entry = self._pending, (start, task['id'])
+        else:
+            end = None
+            target, entry = self._done, (task.get('completed_at', ''), task['id'])
+        self._entries[task['id']] = (target, entry, end, task)
+        target.append(entry)
+        return target
+
+    def add(self, task):
+        self.remove(task['id'])
+        target = self._store(task)
+        if target is not None:
+            entry = target.pop()
+            bisect.insort(target, entry)
+
+    def remove(self, task_id):
+        stored = self._entries.pop(task_id, None)
+        if stored:
+            target, entry = stored[0], stored[1]
+            i = bisect.bisect_left(target, entry)
+            if i < len(target) and target[i] == entry:
+                del target[i]
+
+    def _split(self, now):
+        return bisect.bisect_right(self._pending, (now, '\uffff'))
+
+    def counts(self, now):
+        split = self._split(now)
+        return split, len(self._pending) - split, len(self._done)
+
+    def active(self, now, only_ids=None):
+        """(task, overdue) pairs: overdue first, then by priority, each group in start order"""
+        groups = defaultdict(list)
+        for _, task_id in self._pending[:self._split(now)]:
+            if only_ids is None or task_id in only_ids:
+                _, _, end, task = self._entries[task_id]
+                overdue = end < now
+                groups[(not overdue, PRIORITY_ORDER.get(task['priority'], 4))].append((task, overdue))
+        return [pair for key in sorted(groups) for pair in groups[key]]
+
+    def upcoming(self, now, only_ids=None):
+        return [self._entries[task_id][3] for _, task_id in self._pending[self._split(now):]
+                if only_ids is None or task_id in only_ids]
+
+    def done(self, only_ids=None):
+        """Completed tasks, most recently completed first"""
+        return [self._entries[task_id][3] for _, task_id in reversed(self._done)
+                if only_ids is None or task_id in only_ids]
+
+
+def get_sorted_views():
+    if st.session_state.get('sorted_views') is None:
+        st.session_state.sorted_views = SortedTaskViews(st.session_state.tasks)
+    return st.session_state.sorted_views
+
+
+# ============================================================
+# SECTION 14: TASK CARD RENDERING
+# ============================================================
+class RenderCache:
+    """Bounded LRU of pre-built card markup, shared by all sessions.
+
+    Keys include the workspace and the fields a card shows (see
+    task_version), so a task edited outside this process -- a hand-edited
+    data file that keeps its seq -- never hits a stale entry.
+    """
+
+    def __init__(self, maxsize=CARD_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def get_or_render(self, key, render):
+        with self.lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        value = render()
+        with self.lock:
+            self._items[key] = value
+            if len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return value
+
+
+@st.cache_resource
+def get_render_cache():
+    return RenderCache()
+
+
+def task_version(task):
+    """The displayed fields: a seq alone misses edits made outside the change feed"""
+    return (task['task'], task['priority'], task.get('category'),
+            task['scheduled_date'], task['start_time'], task['end_time'])
+
+
+def render_category_badge(task, weight=""):
+    category = task.get('category', 'General')
+    return (f"<span style='background:{get_category_color(category)};color:white;padding:2px 10px;\n"
+            f"                border-radius:12px;font-size:0.8rem;{weight}'>{html.escape(str(category))}</span>")
+
+
+def render_active_card(task, overdue):
+    """(card box, title, meta line) markup for the Active tab"""
+    def render():
+        box = f"""
+            <div style='background: {"#fef2f2" if overdue else "#ffffff"}; 
+                        padding: 1rem; border-radius: 10px; 
+                        border: 1px solid {"#fecaca" if overdue else "#e2e8f0"};
+                        margin-bottom: 0.5rem;'>
+            </div>
+            """
+        title = f"**{task['task']}** {'🚨 **OVERDUE**' if overdue else ''}"
+        meta = f"""
+                {render_category_badge(task, "font-weight:500;")}
+                <span style='color:#64748b;margin-left:10px;'>📅 {task['scheduled_date']} • 🕐 {task['start_time']}-{task['end_time']}</span>
+                """
+        return box, title, meta
+    return get_render_cache().get_or_render(
+        ('active', st.session_state.workspace, task['id'], task_version(task), overdue), render)
+
+
+def render_upcoming_card(task, time_str):
+    """(title, meta line) markup for the Upcoming tab; time_str changes at most hourly"""
+    def render():
+        meta = f"""
+                {render_category_badge(task)}
+                <span style='color:#64748b;margin-left:10px;'>📅 {task['scheduled_date']} • {time_str}</span>
+                """
+        return f"**{task['task']}**", meta
+    return get_render_cache().get_or_render(
+        ('upcoming', st.session_state.workspace, task['id'], task_version(task), time_str), render)
+
+
+# ============================================================
+# SECTION 15: NEXT-TASK RANKING
+# ============================================================
+def static_task_score(task, start, end):
+    hours = (end - start).total_seconds() / 3600
+    return (PRIORITY_WEIGHTS.get(task['priority'], 0)
+            + CATEGORY_WEIGHTS.get(task.get('category', 'General'), 0)
+            + max(0.0, QUICK_WIN_POINTS - 2 * hours))
+
+
+def task_score(task, now):
+    """Reference (unindexed) score: higher means do it sooner"""
+    start, end = get_task_interval(task)
+    hours_left = (end - now).total_seconds() / 3600
+    if hours_left < 0:
+        urgency = URGENCY_MAX - hours_left * OVERDUE_POINTS_PER_HOUR
+    elif hours_left < URGENCY_HORIZON_HOURS:
+        urgency = URGENCY_MAX * (1 - hours_left / URGENCY_HORIZON_HOURS)
+    else:
+        urgency = 0
+    return static_task_score(task, start, end) + urgency
+
+
+class NextTaskRanker:
+    """Ranked "Do next" queue over pending tasks, kept in heaps.
+
+    task_score is piecewise linear in time: flat before the urgency horizon,
+    one slope inside it, another once overdue. Within a phase every task's
+    score moves at the same rate, so one heap per phase, keyed on the
+    time-independent part, never goes out of order. A timer heap moves tasks
+    between phases as the clock crosses their boundaries. top() merges the
+    three heap heads. Stale heap entries are skipped via per-task versions.
+    """
+
+    SLOPES = (0.0, URGENCY_MAX / URGENCY_HORIZON_HOURS, OVERDUE_POINTS_PER_HOUR)  # calm, due soon, overdue
+
+    def __init__(self, tasks=(), now=None):
+        self.now = now or clock_now()
+        self._heaps = ([], [], [])
+        self._timers = []
+        self._live = {}  # task_id -> (version, phase, task, static, end_hours)
+        self._version = 0
+        for task in tasks:
+            self._place(task)
+        for heap in self._heaps:
+            heapq.heapify(heap)
+        heapq.heapify(self._timers)
+
+    @staticmethod
+    def _hours(moment):
+        return moment.timestamp() / 3600
+
+    def _phase_key(self, phase, static, end_hours):
+        """Score minus slope * now: constant while the task stays in this phase"""
+        if phase == 0:
+            return static
+        if phase == 1:
+            return static + URGENCY_MAX - self.SLOPES[1] * end_hours
+        return static + URGENCY_MAX - self.SLOPES[2] * end_hours
+
+    def _place(self, task, static=None, end_hours=None, push=list.append):
+        if static is None:
+            if task.get('status') != 'pending':
+                return
+            try:
+                start, end = get_task_interval(task)
+            except (KeyError, ValueError):
+                return
+            static, end_hours = static_task_score(task, start, end), self._hours(end)
+        hours_left = end_hours - self._hours(self.now)
+        # Boundaries are inclusive so a task whose timer has fired never lands back in its old phase
+        phase = 2 if hours_left <= 0 else 1 if hours_left <= URGENCY_HORIZON_HOURS else 0
+        self._version += 1
+        self._live[task['id']] = (self._version, phase, task, static, end_hours)
+        push(self._heaps[phase], (-self._phase_key(phase, static, end_hours), task['id'], self._version))
+        if phase == 0:
+            push(self._timers, (end_hours - URGENCY_HORIZON_HOURS, task['id'], self._version))
+        elif phase == 1:
+            push(self._timers, (end_hours, task['id'], self._version))
+
+    def add(self, task):
+        self._live.pop(task['id'], None)
+        self._place(task, push=heapq.heappush)
+        self._maybe_compact()
+
+    def remove(self, task_id):
+        self._live.pop(task_id, None)
+
+    def tick(self, now):
+        """Advance the clock, moving tasks whose phase boundary has passed"""
+        self.now = now
+        now_hours = self._hours(now)
+        while self._timers and self._timers[0][0] <= now_hours:
+            _, task_id, version = heapq.heappop(self._timers)
+            live = self._live.get(task_id)
+            if live and live[0] == version:
+                self._place(live[2], live[3], live[4], push=heapq.heappush)
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        if sum(len(h) for h in self._heaps) > 2 * len(self._live) + 64:
+            live = list(self._live.values())
+            self._live.clear()
+            self._heaps, self._timers = ([], [], []), []
+            for _, _, task, static, end_hours in live:
+                self._place(task, static, end_hours)
+            for heap in self._heaps:
+                heapq.heapify(heap)
+            heapq.heapify(self._timers)
+
+    def top(self, k, now=None):
+        """The k highest-scoring pending tasks as (task, score), best first"""
+        if now is not None:
+            self.tick(now)
+        now_hours = self._hours(self.now)
+        popped = ([], [], [])
+        heads = []
+
+        def advance(phase):
+            heap = self._heaps[phase]
+            while heap:
+                entry = heapq.heappop(heap)
+                live = self._live.get(entry[1])
+                if live and live[0] == entry[2]:
+                    popped[phase].append(entry)
+                    score = -entry[0] + self.SLOPES[phase] * now_hours
+                    heapq.heappush(heads, (-score, entry[1], phase))
+                    return
+
+        for phase in range(3):
+            advance(phase)
+        ranked = []
+        while heads and len(ranked) < k:
+            neg_score, task_id, phase = heapq.heappop(heads)
+            ranked.append((self._live[task_id][2], -neg_score))
+            advance(phase)
+        for phase, entries in enumerate(popped):
+            for entry in entries:
+                heapq.heappush(self._heaps[phase], entry)
+        return ranked
+
+
+def get_task_ranker():
+    if st.session_state.get('task_ranker') is None:
+        st.session_state.task_ranker = NextTaskRanker(st.session_state.tasks, clock_now())
+    return st.session_state.task_ranker
+
+
+# ============================================================
+# SECTION 16: AUTO-SCHEDULER
+# ============================================================
+def round_up_to_slot(moment):
+    floored = moment.replace(minute=moment.minute - moment.minute % SLOT_MINUTES, second=0, microsecond=0)
+    return floored if floored == moment else floored + timedelta(minutes=SLOT_MINUTES)
+
+
+def get_free_slots(first_day, days=SCHEDULE_HORIZON_DAYS, not_before=None):
+    """Free (start, end) gaps inside working hours, sorted by start"""
+    window_start = datetime.combine(first_day, WORKDAY_START)
+    window_end = datetime.combine(first_day + timedelta(days=days - 1), WORKDAY_END)
+    busy = sorted(get_task_interval(t) for t in get_interval_index().overlaps(window_start, window_end))
+    not_before = round_up_to_slot(not_before or clock_now())
+    
+    slots = []
+    busy_pos = 0
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        cursor = max(datetime.combine(day, WORKDAY_START), not_before)
+        day_end = datetime.combine(day, WORKDAY_END)
+        while busy_pos < len(busy) and busy[busy_pos][1] <= cursor:
+            busy_pos += 1
+        i = busy_pos
+        while cursor < day_end:
+            if i < len(busy) and busy[i][0] < day_end:
+                busy_start, busy_end = busy[i]
+                if busy_start > cursor:
+                    slots.append((cursor, busy_start))
+                cursor = max(cursor, busy_end)
+                i += 1
+            else:
+                slots.append((cursor, day_end))
+                break
+    return slots
+
+
+def pack_tasks(items, first_day, days=SCHEDULE_HORIZON_DAYS, not_before=None):
+    """Place items ({'task', 'priority', 'duration' in hours, ...}) into free slots.
+
+    Items are taken highest priority first (input order breaks ties) and each
+    goes into the earliest gap long enough to hold it. Returns (placed, unplaced)
+    where placed is a list of (item, start, end) datetimes.
+    """
+    queue = [(PRIORITY_ORDER.get(item.get('priority'), 4), i, item) for i, item in enumerate(items)]
+    heapq.heapify(queue)
+    slots = get_free_slots(first_day, days, not_before)
+    
+    placed, unplaced = [], []
+    while queue:
+        _, _, item = heapq.heappop(queue)
+        length = timedelta(hours=item['duration'])
+        for i, (slot_start, slot_end) in enumerate(slots):
+            if slot_end - slot_start >= length:
+                task_end = slot_start + length
+                placed.append((item, slot_start, task_end))
+                if task_end < slot_end:
+                    slots[i] = (task_end, slot_end)
+                else:
+                    del slots[i]
+                break
+        else:
+            unplaced.append(item)
+    
+    placed.sort(key=lambda p: p[1])
+    return placed, unplaced
+
+
+# ============================================================
+# SECTION 17: CHANGE FEED
+# ============================================================
+class ChangeFeed:
+    """Sequence-numbered log of task mutations for delta sync.
+
+    Every upsert/delete gets the next sequence number, which is also stamped on
+    the task as 'seq'. The latest CHANGE_FEED_LIMIT changes are kept in memory
+    and in CHANGES_FILE; a cursor older than that must resync the full list.
+    """
+
+    def __init__(self, path=CHANGES_FILE, limit=CHANGE_FEED_LIMIT, min_seq=0, listener=None):
+        self.path = path
+        self.limit = limit
+        self.listener = listener
+        self.lock = threading.Lock()
+        self._changes = []
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        self._changes.append(json.loads(line))
+                    except ValueError:
+                        pass  # torn write at the tail
+        self._changes = self._changes[-limit:]
+        self.seq = max(self._changes[-1]['seq'] if self._changes else 0, min_seq)
+        self._floor = self._changes[0]['seq'] - 1 if self._changes else self.seq
+
+    def record(self, upserts=(), deletes=()):
+        """Stamp and log changes; returns the (first, last) sequence numbers used"""
+        now = datetime.now().isoformat(timespec="seconds")
+        upserts, deletes = list(upserts), list(deletes)
+        with self.lock:
+            first = self.seq + 1
+            batch = []
+            for task in upserts:
+                self.seq += 1
+                task['seq'] = self.seq
+                batch.append({"seq": self.seq, "op": "upsert", "id": task['id'], "at": now, "task": dict(task)})
+            for task_id in deletes:
+                self.seq += 1
+                batch.append({"seq": self.seq, "op": "delete", "id": task_id, "at": now})
+            if batch:
+                self._changes.extend(batch)
+                append_json_lines(self.path, batch)
+                if len(self._changes) > 2 * self.limit:
+                    self._compact()
+            last = self.seq
+        if self.listener and (upserts or deletes):
+            self.listener(upserts, deletes)
+        return first, last
+
+    def _compact(self):
+        self._changes = self._changes[-self.limit:]
+        self._floor = self._changes[0]['seq'] - 1
+        atomic_write_json(self.path, self._changes, lines=True)
+
+    def since(self, cursor):
+        """(new_cursor, changes) with the latest change per task after cursor.
+
+        changes is None when cursor predates the retained log and the client
+        has to reload everything.
+        """
+        with self.lock:
+            if cursor < self._floor:
+                return self.seq, None
+            start = bisect.bisect_right(self._changes, cursor, key=lambda c: c['seq'])
+            latest = {c['id']: c for c in self._changes[start:]}
+            return self.seq, sorted(latest.values(), key=lambda c: c['seq'])
+
+
+def get_change_feed(workspace=None):
+    """The workspace's feed, shared by its sessions and the JSON API"""
+    return get_workspace_registry().get(workspace or st.session_state.workspace).feed
+
+
+def apply_changes(tasks, changes):
+    """Apply compacted feed changes to a task list in place; returns the upserted records"""
+    positions = {t['id']: i for i, t in enumerate(tasks)}
+    upserted, deleted = [], set()
+    for change in changes:
+        if change['op'] == 'delete':
+            deleted.add(change['id'])
+            continue
+        task = dict(change['task'])
+        if change['id'] in positions:
+            tasks[positions[change['id']]] = task
+        else:
+            positions[change['id']] = len(tasks)
+            tasks.append(task)
+        upserted.append(task)
+    if deleted:
+        tasks[:] = [t for t in tasks if t['id'] not in deleted]
+    return upserted
+
+
+def commit_tasks(upserts=(), deletes=()):
+    """Log a session's changes in the feed and write them into the workspace's data file.
+
+    Like an API batch, the change set is applied to the store's latest list under
+    its lock rather than saving the session's own copy, so writes this session has
+    not synced yet (the API, retention, other sessions) are kept.
+    """
+    store = get_workspace_registry().get(st.session_state.workspace).store
+    with store.lock:
+        seen = get_data_mtime(store.path) == st.session_state.get('data_mtime')
+        first, last = store.feed.record(upserts, deletes)
+        apply_changes(store.tasks(), [{"op": "upsert", "id": t['id'], "task": t} for t in upserts] +
+                      [{"op": "delete", "id": task_id} for task_id in deletes])
+        store.save()
+        mtime = get_data_mtime(store.path)
+    # Skip our own changes on the next sync unless someone else wrote in between
+    if st.session_state.get('feed_cursor') == first - 1:
+        st.session_state.feed_cursor = last
+    # A file changed from outside since this session read it is reloaded on the next rerun
+    st.session_state.data_mtime = mtime if seen else None
+
+
+def sync_session_tasks():
+    """Bring the session's tasks up to date with the feed, falling back to a full reload"""
+    cursor, changes = get_change_feed().since(st.session_state.feed_cursor)
+    if changes is None:
+        st.session_state.tasks = load_tasks(session_data_file())
+        reset_indexes()
+    else:
+        for task in apply_changes(st.session_state.tasks, changes):
+            index_task(task)
+        for change in changes:
+            if change['op'] == 'delete':
+                unindex_task(change['id'])
+    st.session_state.feed_cursor = cursor
+    st.session_state.data_mtime = get_data_mtime(session_data_file())
+
+
+# ============================================================
+# SECTION 18: LOCAL HTTP API
+# ============================================================
+class TaskFileStore:
+    """Process-wide copy of a workspace's data file shared by API requests.
+
+    The parsed list is reused until the file's mtime changes, so a batch costs
+    one save rather than a load and a save.
+    """
+
+    def __init__(self, path, feed, tasks=None):
+        self.lock = threading.Lock()
+        self.path = path
+        self.feed = feed
+        self._tasks = tasks if tasks is not None else []
+        self._mtime = get_data_mtime(path) if tasks is not None else -1
+
+    def tasks(self):
+        mtime = get_data_mtime(self.path)
+        if mtime != self._mtime:
+            self._tasks = load_tasks(self.path)
+            self._mtime = mtime
+        return self._tasks
+
+    def save(self):
+        save_tasks(self._tasks, self.path)
+        self._mtime = get_data_mtime(self.path)
+
+
+def validate_task_fields(fields):
+    """Raise ValueError unless fields describe a task the views and indexes can place"""
+    name = fields.get('task')
+    if not isinstance(name, str) or not name.strip():
+        raise ValueError("task must be a non-empty string")
+    if fields.get('category', 'General') not in CATEGORIES:
+        raise ValueError(f"category must be one of {', '.join(CATEGORIES)}")
+    if fields.get('priority', 'Medium') not in PRIORITY_ORDER:
+        raise ValueError(f"unknown priority {fields['priority']!r}")
+    scheduled = fields.get('scheduled_date')
+    if not isinstance(scheduled, str) or not re.fullmatch(r'\d{4}-\d{2}-\d{2}', scheduled):
+        raise ValueError("scheduled_date must be YYYY-MM-DD")
+    date.fromisoformat(scheduled)
+    for key in ('start_time', 'end_time'):
+        value = fields.get(key)
+        if not isinstance(value, str) or not re.fullmatch(r'\d{2}:\d{2}', value):
+            raise ValueError(f"{key} must be HH:MM")
+        datetime.strptime(value, "%H:%M")
+
+
+def api_create(tasks, items):
+    results = []
+    for item in items:
+        if not isinstance(item, dict):
+            results.append({"ok": False, "error": "item must be an object"})
+            continue
+        try:
+            validate_task_fields(item)
+            task = make_task(item['task'], item.get('priority', 'Medium'), item.get('category', 'General'),
+                             item['scheduled_date'], item['start_time'], item['end_time'])
+        except (KeyError, TypeError, ValueError) as e:
+            results.append({"ok": False, "error": str(e)})
+            continue
+        tasks.append(task)
+        results.append({"ok": True, "id": task['id']})
+    return results
+
+
+def api_update(tasks, items):
+    by_id = {t['id']: t for t in tasks}
+    results = []
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get('id'), str) \
+                or not isinstance(item.get('updates', {}), dict):
+            results.append({"ok": False, "error": "item must be {\"id\": string, \"updates\": object}"})
+            continue
+        task = by_id.get(item['id'])
+        if task is None:
+            results.append({"ok": False, "error": "not found"})
+            continue
+        updates = {k: v for k, v in item.get('updates', {}).items() if k != 'id'}
+        try:
+            validate_task_fields({**task, **updates})
+        except (KeyError, TypeError, ValueError) as e:
+            results.append({"ok": False, "error": str(e)})
+            continue
+        task.update(updates)
+        results.append({"ok": True, "id": task['id']})
+    return results
+
+
+def api_complete(tasks, ids):
+    by_id = {t['id']: t for t in tasks}
+    completed_at = get_process_clock().now().strftime("%Y-%m-%d %H:%M")
+    results = []
+    for task_id in ids:
+        if not isinstance(task_id, str):
+            results.append({"ok": False, "error": "id must be a string"})
+            continue
+        task = by_id.get(task_id)
+        if task is None:
+            results.append({"ok": False, "error": "not found"})
+            continue
+        task['status'] = 'completed'
+        task['completed_at'] = completed_at
+        results.append({"ok": True, "id": task_id})
+    return results
+
+
+def api_delete(tasks, ids):
+    doomed = {task_id for task_id in ids if isinstance(task_id, str)}
+    kept = [t for t in tasks if t['id'] not in doomed]
+    found = {t['id'] for t in tasks} & doomed
+    tasks[:] = kept
+    return [{"ok": task_id in found, "id": task_id} if isinstance(task_id, str)
+            else {"ok": False, "error": "id must be a string"} for task_id in ids]
+
+
+def api_search(tasks, queries):
+    results = []
+    for query in queries:
+        if not isinstance(query, str):
+            results.append({"error": "query must be a string"})
+            continue
+        try:
+            results.append(filter_tasks(tasks, query))
+        except (TypeError, ValueError) as e:
+            results.append({"error": str(e)})
+    return results
+
+
+# path -> (handler, change recorded for successful items)
+API_BATCH_ROUTES = {
+    "/api/tasks/create": (api_create, "upsert"),
+    "/api/tasks/update": (api_update, "upsert"),
+    "/api/tasks/complete": (api_complete, "upsert"),
+    "/api/tasks/delete": (api_delete, "delete"),
+    "/api/tasks/search": (api_search, None),
+}
+
+API_REASONS = {200: "OK", 204: "No Content", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden",
+               404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+               415: "Unsupported Media Type"}
+
+
+def check_api_access(method, headers):
+    """(status, payload) refusing the request, or None when it may go ahead"""
+    origin = headers.get("origin")
+    if origin is not None and origin not in API_ORIGINS:
+        return 403, {"error": "origin not allowed"}
+    if method == "OPTIONS":
+        return None  # CORS preflight; browsers send it without the token
+    token = headers.get(API_TOKEN_HEADER.lower(), "")
+    if not API_TOKEN or not hmac.compare_digest(token.encode(), API_TOKEN.encode()):
+        return 401, {"error": f"missing or wrong {API_TOKEN_HEADER} header"}
+    if method == "POST" and headers.get("content-type", "").split(";")[0].strip().lower() != "application/json":
+        return 415, {"error": "Content-Type must be application/json"}
+    return None
+
+
+def handle_api_request(registry, method, target, body):
+    """Route one request; returns (status, payload)"""
+    url = urlsplit(target)
+    path = url.path
+    workspace = parse_qs(url.query).get("workspace", [DEFAULT_WORKSPACE])[0]
+    if not WORKSPACE_NAME_PATTERN.fullmatch(workspace):
+        return 400, {"error": "invalid workspace name"}
+    store = registry.get(workspace).store
+    if method == "GET" and path == "/api/tasks":
+        with store.lock:
+            return 200, {"tasks": store.tasks(), "cursor": store.feed.seq}
+    if method == "GET" and path == "/api/changes":
+        try:
+            since = int(parse_qs(url.query).get("since", ["0"])[0])
+        except ValueError:
+            return 400, {"error": "since must be an integer"}
+        with store.lock:
+            cursor, changes = store.feed.since(since)
+            if changes is None:
+                return 200, {"cursor": cursor, "reset": True, "tasks": store.tasks()}
+        return 200, {"cursor": cursor, "changes": changes}
+    if method == "GET" and path == "/api/events":
+        params = parse_qs(url.query)
+        try:
+            since = int(params.get("since", ["0"])[0])
+            wait = min(float(params.get("wait", ["0"])[0]), 60)
+        except ValueError:
+            return 400, {"error": "since and wait must be numbers"}
+        cursor, events = get_reminder_scheduler().events_since(workspace, since, wait)
+        return 200, {"cursor": cursor, "events": events}
+    if path not in API_BATCH_ROUTES:
+        return 404, {"error": f"no route for {path}"}
+    if method != "POST":
+        return 405, {"error": "use POST"}
+    try:
+        items = json.loads(body or b"[]")
+    except ValueError:
+        return 400, {"error": "body must be JSON"}
+    if not isinstance(items, list):
+        return 400, {"error": "body must be a JSON array"}
+    handler, change = API_BATCH_ROUTES[path]
+    with store.lock:
+        tasks = store.tasks()
+        results = handler(tasks, items)
+        changed_ids = [r['id'] for r in results if r.get('ok')] if change else []
+        if changed_ids:
+            if change == "delete":
+                store.feed.record(deletes=changed_ids)
+            else:
+                changed = set(changed_ids)
+                store.feed.record(upserts=[t for t in tasks if t['id'] in changed])
+            store.save()
+    return 200, {"results": results}
+
+
+async def serve_api_connection(registry, reader, writer):
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                break
+            lines = head.decode("latin-1").split("\r\n")
+            method, target, _ = lines[0].split(" ", 2)
+            headers = {k.strip().lower(): v.strip() for k, _, v in
+                       (line.partition(":") for line in lines[1:] if line)}
+            length = int(headers.get("content-length", 0))
+            # Refuse on the headers alone, so nobody gets a body buffered without the token
+            refused = check_api_access(method, headers)
+            if refused is None and length > API_MAX_BODY_BYTES:
+                refused = 413, {"error": "body too large"}
+            if refused:
+                status, payload = refused
+                body = None  # left unread, so the connection is closed after the reply
+            else:
+                body = await reader.readexactly(length) if length else b""
+                if method == "OPTIONS":
+                    status, payload = 204, None
+                elif target.startswith("/api/events"):
+                    # May block waiting for events, so keep it off the event loop
+                    status, payload = await asyncio.to_thread(
+                        handle_api_request, registry, method, target, body)
+                else:
+                    status, payload = handle_api_request(registry, method, target, body)
+            data = b"" if payload is None else json.dumps(payload).encode()
+            keep_alive = body is not None and headers.get("connection", "").lower() != "close"
+            origin = headers.get("origin")
+            cors = (f"Access-Control-Allow-Origin: {origin}\r\n"
+                    f"Access-Control-Allow-Methods: GET, POST, OPTIONS\r\n"
+                    f"Access-Control-Allow-Headers: Content-Type, {API_TOKEN_HEADER}\r\n"
+                    f"Vary: Origin\r\n") if origin in API_ORIGINS else ""
+            writer.write(
+                f"HTTP/1.1 {status} {API_REASONS[status]}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"{cors}"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+            )
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def run_api_server(registry, host, port):
+    server = await asyncio.start_server(
+        lambda r, w: serve_api_connection(registry, r, w), host, port)
+    async with server:
+        await server.serve_forever()
+
+
+@st.cache_resource
+def start_api_server():
+    """Start the JSON API once per process on a background event loop"""
+    if not API_PORT:
+        return None
+    if not API_TOKEN:
+        logger.error("TUSK API not started: TUSK_API_PORT is set but TUSK_API_TOKEN is not")
+        return None
+    registry = get_workspace_registry()
+
+    def run():
+        try:
+            asyncio.run(run_api_server(registry, API_HOST, API_PORT))
+        except OSError as e:
+            logger.error("TUSK API not started on %s:%s: %s", API_HOST, API_PORT, e)
+
+    threading.Thread(target=run, name="tusk-api", daemon=True).start()
+    return registry
+
+
+# ============================================================
+# SECTION 19: WORKSPACE PARTITIONS
+# ============================================================
+class WorkspacePartition:
+    """A workspace's process-wide state: its change feed and API store"""
+
+    def __init__(self, workspace):
+        self.workspace = workspace
+        data_file = workspace_file(workspace, DATA_FILE)
+        tasks = load_tasks(data_file)
+        min_seq = max((t.get('seq', 0) for t in tasks), default=0)
+        scheduler = get_reminder_scheduler()
+        self.feed = ChangeFeed(workspace_file(workspace, CHANGES_FILE), min_seq=min_seq,
+                               listener=lambda upserts, deletes: scheduler.update(workspace, upserts, deletes))
+        self.store = TaskFileStore(data_file, self.feed, tasks)
+        self.focus = FocusLog(workspace_file(workspace, FOCUS_LOG_FILE))
+        self.templates = TemplateRegistry(workspace_file(workspace, TEMPLATES_FILE))
+        self.last_used = datetime.now()
+        scheduler.update(workspace, tasks)
+
+
+class WorkspaceRegistry:
+    """Loads workspace partitions on first use and evicts idle ones.
+
+    Partitions are kept in least-recently-used order; anything idle for
+    WORKSPACE_IDLE_SECONDS, or beyond MAX_RESIDENT_WORKSPACES, is dropped and
+    simply reloaded from its files when next needed. A partition is loaded
+    outside the registry lock, so a slow load only holds up its own workspace.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._partitions = OrderedDict()
+        self._loading = {}
+
+    def __len__(self):
+        return len(self._partitions)
+
+    def resident(self):
+        with self.lock:
+            return list(self._partitions.values())
+
+    def _touch(self, workspace):
+        partition = self._partitions.pop(workspace, None)
+        if partition is not None:
+            partition.last_used = datetime.now()
+            self._partitions[workspace] = partition
+        return partition
+
+    def get(self, workspace):
+        with self.lock:
+            partition = self._touch(workspace)
+            if partition is not None:
+                return partition
+            loading = self._loading.setdefault(workspace, threading.Lock())
+        with loading:
+            with self.lock:
+                partition = self._touch(workspace)
+            if partition is not None:
+                return partition  # loaded by the thread we waited for
+            partition = WorkspacePartition(workspace)
+            with self.lock:
+                self._partitions[workspace] = partition
+                self._loading.pop(workspace, None)
+                self._evict_idle(partition.last_used)
+            return partition
+
+    def _drop(self, workspace):
+        if self._partitions.pop(workspace, None) is not None:
+            get_reminder_scheduler().drop_workspace(workspace)
+
+    def _evict_idle(self, now):
+        cutoff = now - timedelta(seconds=WORKSPACE_IDLE_SECONDS)
+        while len(self._partitions) > 1:
+            oldest = next(iter(self._partitions.values()))
+            if len(self._partitions) <= MAX_RESIDENT_WORKSPACES and oldest.last_used >= cutoff:
+                break
+            self._drop(oldest.workspace)
+
+    def claim_legacy_data(self, workspace):
+        """Move a pre-workspace install's top-level files into a new workspace; True if it did.
+
+        Without TUSK_SHARED_WORKSPACE the top-level files belong to no visible
+        workspace, so the first workspace opened that has no tasks of its own
+        (normally the owner's, on the first start after an upgrade) takes them over.
+        """
+        if SHARED_WORKSPACE or workspace == DEFAULT_WORKSPACE or not os.path.exists(DATA_FILE):
+            return False
+        with self.lock:
+            if not os.path.exists(DATA_FILE) or os.path.exists(workspace_file(workspace, DATA_FILE)):
+                return False
+            # Both may be resident (the API can open any workspace); reload them from the moved files
+            self._drop(DEFAULT_WORKSPACE)
+            self._drop(workspace)
+            os.makedirs(os.path.dirname(workspace_file(workspace, DATA_FILE)), exist_ok=True)
+            for filename in LEGACY_FILES:
+                if os.path.exists(filename):
+                    os.replace(filename, workspace_file(workspace, filename))
+            if os.path.exists(snapshot_path(DATA_FILE)):
+                os.remove(snapshot_path(DATA_FILE))
+        logger.warning("Moved the tasks in %s into workspace %s", os.path.abspath(DATA_FILE), workspace)
+        return True
+
+
+@st.cache_resource
+def get_workspace_registry():
+    return WorkspaceRegistry()
+
+
+def user_workspace_email():
+    """Email of the signed-in user, or None when the app has no authentication"""
+    user = getattr(st, 'user', None) or getattr(st, 'experimental_user', None)
+    if user is None or not user.get('is_logged_in', True):
+        return None
+    return user.get('email')
+
+
+def user_workspace():
+    """The signed-in user's own workspace; the email is hashed to keep it out of paths"""
+    email = user_workspace_email()
+    if not email:
+        return None
+    return USER_WORKSPACE_PREFIX + hashlib.sha256(email.strip().lower().encode()).hexdigest()[:32]
+
+
+def resolve_workspace():
+    """The signed-in user's workspace, else the one in ?workspace=, else a new private one"""
+    workspace = user_workspace()
+    if workspace:
+        return workspace
+    requested = st.query_params.get('workspace')
+    if requested is None:
+        if SHARED_WORKSPACE:
+            return DEFAULT_WORKSPACE
+        current = st.session_state.get('workspace')
+        if current and current != DEFAULT_WORKSPACE and not current.startswith(USER_WORKSPACE_PREFIX):
+            requested = current  # the link lost its parameter; stay in this session's workspace
+    elif not WORKSPACE_NAME_PATTERN.fullmatch(requested) or requested.startswith(USER_WORKSPACE_PREFIX) \
+            or (requested == DEFAULT_WORKSPACE and not SHARED_WORKSPACE):
+        st.error(f"Invalid workspace '{requested}' - starting a new private workspace")
+        requested = None
+    # An unguessable id kept in the URL, so a refresh or bookmark finds the same tasks
+    workspace = requested or secrets.token_hex(16)
+    st.query_params['workspace'] = workspace
+    return workspace
+
+
+# ============================================================
+# SECTION 20: REMINDERS
+# ============================================================
+class ReminderScheduler:
+    """Fires reminder and overdue events for pending tasks from one background thread.
+
+    A single heap holds the upcoming boundaries of every scheduled task in every
+    loaded workspace: REMINDER_LEAD_MINUTES before the start, and the end. Each
+    (workspace, task id) has a version, so rescheduling or deleting a task only
+    replaces it and stale heap entries are dropped when they surface. The thread
+    sleeps until the earliest boundary or the next change, never polling.
+    Boundaries are measured on the process clock the views use, so they fire at
+    the same simulated moments the task cards turn overdue.
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.cond = threading.Condition()
+        self.seq = 0
+        self._heap = []          # (when, workspace, task_id, version, kind, name)
+        self._versions = {}      # (workspace, task_id) -> version
+        self._next_version = 0
+        self._events = defaultdict(list)    # workspace -> [event, ...]
+        if isinstance(clock, SimulatedClock):
+            clock.on_advance.append(self.wake)
+        threading.Thread(target=self._run, name="tusk-reminders", daemon=True).start()
+
+    def __len__(self):
+        return len(self._versions)
+
+    def update(self, workspace, upserts=(), deletes=()):
+        now = self.clock.now()
+        with self.cond:
+            for task_id in deletes:
+                self._versions.pop((workspace, task_id), None)
+            for task in upserts:
+                key = (workspace, task['id'])
+                self._versions.pop(key, None)
+                if task.get('status') != 'pending':
+                    continue
+                try:
+                    start, end = get_task_interval(task)
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if end <= now:
+                    continue
+                self._next_version += 1
+                self._versions[key] = self._next_version
+                remind_at = start - timedelta(minutes=REMINDER_LEAD_MINUTES)
+                if remind_at > now:
+                    heapq.heappush(self._heap, (remind_at, workspace, task['id'], self._next_version,
+                                                'reminder', task['task']))
+                heapq.heappush(self._heap, (end, workspace, task['id'], self._next_version,
+                                            'overdue', task['task']))
+            self._maybe_compact()
+            self.cond.notify_all()
+
+    def drop_workspace(self, workspace):
+        """Forget an evicted workspace; its tasks are scheduled again when it is next loaded"""
+        with self.cond:
+            self._versions = {key: v for key, v in self._versions.items() if key[0] != workspace}
+            self._heap = [e for e in self._heap if e[1] != workspace]
+            heapq.heapify(self._heap)
+            self._events.pop(workspace, None)
+
+    def wake(self):
+        """Re-check the heap now, e.g. after a simulated clock jumped forward"""
+        with self.cond:
+            self.cond.notify_all()
+
+    def _maybe_compact(self):
+        if len(self._heap) > 2 * len(self._versions) + 64:
+            self._heap = [e for e in self._heap if self._versions.get((e[1], e[2])) == e[3]]
+            heapq.heapify(self._heap)
+
+    def _run(self):
+        with self.cond:
+            while True:
+                now = self.clock.now()
+                while self._heap and self._heap[0][0] <= now:
+                    when, workspace, task_id, version, kind, name = heapq.heappop(self._heap)
+                    if self._versions.get((workspace, task_id)) != version:
+                        continue
+                    if kind == 'overdue':
+                        del self._versions[(workspace, task_id)]
+                    self._emit(workspace, {"kind": kind, "id": task_id, "task": name,
+                                           "at": when.isoformat(timespec="minutes")})
+                timeout = self.clock.seconds_until(self._heap[0][0]) if self._heap else None
+                self.cond.wait(None if timeout is None else max(timeout, 0))
+
+    def _emit(self, workspace, event):
+        self.seq += 1
+        event['seq'] = self.seq
+        events = self._events[workspace]
+        events.append(event)
+        if len(events) > 2 * REMINDER_EVENT_LIMIT:
+            del events[:-REMINDER_EVENT_LIMIT]
+        self.cond.notify_all()
+
+    def events_since(self, workspace, cursor, wait=0):
+        """(new_cursor, events) for workspace after cursor, waiting up to wait seconds for one"""
+        deadline = datetime.now() + timedelta(seconds=wait)
+        with self.cond:
+            while True:
+                events = self._events.get(workspace, [])
+                start = bisect.bisect_right(events, cursor, key=lambda e: e['seq'])
+                remaining = (deadline - datetime.now()).total_seconds()
+                if start < len(events) or remaining <= 0:
+                    return self.seq, events[start:]
+                self.cond.wait(remaining)
+
+
+@st.cache_resource
+def get_reminder_scheduler():
+    return ReminderScheduler(get_process_clock())
+
+
+def show_reminders():
+    """Toast this session's new reminder and overdue events"""
+    get_workspace_registry().get(st.session_state.workspace)  # an open page keeps its workspace loaded
+    cursor, events = get_reminder_scheduler().events_since(
+        st.session_state.workspace, st.session_state.reminder_cursor)
+    st.session_state.reminder_cursor = cursor
+    for event in events:
+        if event['kind'] == 'reminder':
+            st.toast(f"⏰ Starting soon: {event['task']}")
+        else:
+            st.toast(f"🚨 Overdue: {event['task']}")
+
+
+@st.fragment(run_every=REMINDER_CHECK_SECONDS)
+def reminder_inbox():
+    # Streamlit can't push into a browser session: a session only sees new state when it
+    # reruns something itself. So the events reach it through this fragment's timer, which
+    # only reads new events from memory; the rest of the page, including the overdue
+    # styling of the cards, catches up on its next rerun rather than being rerun for it.
+    show_reminders()
+
+
+# ============================================================
+# SECTION 21: RETENTION
+# ============================================================
+def completed_sort_key(task):
+    return task.get('completed_at') or task.get('scheduled_date', '')
+
+
+def expired_tasks(tasks, now, days=RETENTION_DAYS, max_completed=RETENTION_MAX_COMPLETED):
+    """Completed tasks past the retention rules, oldest first"""
+    completed = sorted((t for t in tasks if t['status'] == 'completed'), key=completed_sort_key)
+    over_cap = max(0, len(completed) - max_completed) if max_completed else 0
+    if days:
+        cutoff = (now - timedelta(days=days)).strftime("%Y-%m-%d %H:%M")
+        too_old = bisect.bisect_left(completed, cutoff, key=completed_sort_key)
+        over_cap = max(over_cap, too_old)
+    return completed[:over_cap]
+
+
+def archive_tasks(workspace, tasks, now):
+    path = workspace_file(workspace, ARCHIVE_FILE)
+    archived_at = now.strftime("%Y-%m-%d %H:%M")
+    append_json_lines(path, ({**t, "archived_at": archived_at} for t in tasks))
+
+
+def enforce_retention(partition, now, limit=RETENTION_BATCH):
+    """Retire up to limit expired tasks from one workspace; returns how many were retired"""
+    store = partition.store
+    with store.lock:
+        tasks = store.tasks()
+        expired = expired_tasks(tasks, now)[:limit]
+        if not expired:
+            return 0
+        if RETENTION_MODE == "archive":
+            archive_tasks(partition.workspace, expired, now)
+        retired = {t['id'] for t in expired}
+        tasks[:] = [t for t in tasks if t['id'] not in retired]
+        # Sessions drop them on their next sync, like any other delete
+        store.feed.record(deletes=[t['id'] for t in expired])
+        store.save()
+        return len(expired)
+
+
+def run_retention(registry, wake):
+    while True:
+        backlog = False
+        for partition in registry.resident():
+            try:
+                backlog |= enforce_retention(partition, get_process_clock().now()) == RETENTION_BATCH
+            except OSError as e:
+                logger.warning("TUSK retention failed for %s: %s", partition.workspace, e)
+        # Work through a large backlog in quick small passes, then settle down
+        wake.wait(1 if backlog else RETENTION_INTERVAL_SECONDS)
+        wake.clear()
+
+
+@st.cache_resource
+def start_retention_job():
+    """Background compaction of completed tasks, once per process when a rule is set"""
+    if not (RETENTION_DAYS or RETENTION_MAX_COMPLETED):
+        return None
+    wake = threading.Event()
+    threading.Thread(target=run_retention, args=(get_workspace_registry(), wake),
+                     name="tusk-retention", daemon=True).start()
+    return wake
+
+
+# ============================================================
+# SECTION 22: SESSION STATE INITIALIZATION
+# ============================================================
+start_api_server()
+start_retention_job()
+tick_clock()
+
+_workspace = resolve_workspace()
+if st.session_state.get('workspace') != _workspace:
+    if get_workspace_registry().claim_legacy_data(_workspace):
+        st.toast(f"📦 Your existing tasks from {DATA_FILE} were moved into this workspace")
+    st.session_state.workspace = _workspace
+    st.session_state.pop('tasks', None)
+    st.session_state.op_log = None
+
+# Pick up other writers' changes: deltas from the feed for this process (e.g. the
+# JSON API), a full reload if the file was changed from outside it
 if 'tasks' not in st.session_state:
-    st.session_state.tasks = load_tasks()
+    st.session_state.feed_cursor = get_change_feed().seq
+    st.session_state.tasks = load_tasks(session_data_file())
+    st.session_state.data_mtime = get_data_mtime(session_data_file())
+    reset_indexes()
+elif st.session_state.feed_cursor < get_change_feed().seq:
+    sync_session_tasks()
+elif st.session_state.data_mtime != get_data_mtime(session_data_file()):
+    st.session_state.tasks = load_tasks(session_data_file())
+    st.session_state.data_mtime = get_data_mtime(session_data_file())
+    reset_indexes()
+
+if 'reminder_cursor' not in st.session_state:
+    st.session_state.reminder_cursor = get_reminder_scheduler().seq
 
 if 'editing_task_id' not in st.session_state:
     st.session_state.editing_task_id = None
@@ -362,20 +2563,37 @@ if 'selected_category' not in st.session_state:
     st.session_state.selected_category = "All"
 
 if 'pomodoro_active' not in st.session_state:
-    st.session_state.pomodoro_active = False
-
-if 'pomodoro_start_time' not in st.session_state:
-    st.session_state.pomodoro_start_time = None
-
-if 'pomodoro_duration' not in st.session_state:
-    st.session_state.pomodoro_duration = 25
+    # A timer still running in the focus log survives a page refresh
+    _open_focus = get_focus_log().open_session
+    st.session_state.pomodoro_active = _open_focus is not None
+    st.session_state.pomodoro_start_time = datetime.fromisoformat(_open_focus['at']) if _open_focus else None
+    st.session_state.pomodoro_duration = _open_focus['plan'] if _open_focus else 25
+    st.session_state.pomodoro_task_id = _open_focus['id'] if _open_focus else None
 
 if 'active_tab' not in st.session_state:
     st.session_state.active_tab = 0
 
+if 'interval_index' not in st.session_state:
+    st.session_state.interval_index = None
+
+if 'query_index' not in st.session_state:
+    st.session_state.query_index = None
+
+if 'sorted_views' not in st.session_state:
+    st.session_state.sorted_views = None
+
+if 'task_ranker' not in st.session_state:
+    st.session_state.task_ranker = None
+
+if 'tab_page_size' not in st.session_state:
+    st.session_state.tab_page_size = TASK_PAGE_SIZE
+
+if 'op_log' not in st.session_state:
+    st.session_state.op_log = None
+
 
 # ============================================================
-# SECTION 10: MAIN PAGE UI
+# SECTION 23: MAIN PAGE UI
 # ============================================================
 
 # ----- HEADER -----
@@ -386,11 +2604,32 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+if st.session_state.workspace.startswith(USER_WORKSPACE_PREFIX):
+    st.caption(f"🗂️ Workspace of **{user_workspace_email()}**")
+elif st.session_state.workspace != DEFAULT_WORKSPACE:
+    st.caption(f"🗂️ Workspace: **{st.session_state.workspace}** - bookmark this page to come back to your tasks")
+
+if isinstance(get_clock(), SimulatedClock):
+    st.caption(f"🕰️ Simulated time: **{clock_now().strftime('%a %Y-%m-%d %H:%M')}**")
+
+reminder_inbox()
+
+_op_log = get_op_log()
+_undo_col, _redo_col, _ = st.columns([1, 1, 6])
+with _undo_col:
+    if st.button("↩️ Undo", key="undo_btn", use_container_width=True, disabled=not _op_log.undo_stack,
+                 help=f"Undo: {_op_log.undo_stack[-1][0]}" if _op_log.undo_stack else None):
+        undo_last()
+        st.rerun()
+with _redo_col:
+    if st.button("↪️ Redo", key="redo_btn", use_container_width=True, disabled=not _op_log.redo_stack,
+                 help=f"Redo: {_op_log.redo_stack[-1][0]}" if _op_log.redo_stack else None):
+        redo_last()
+        st.rerun()
+
 # ----- STATS ROW -----
-_pending = [t for t in st.session_state.tasks if t['status'] == 'pending']
-_active_count = len([t for t in _pending if is_task_active(t)])
-_future_count = len([t for t in _pending if is_task_future(t)])
-_done_count = len([t for t in st.session_state.tasks if t['status'] == 'completed'])
+_now = clock_now()
+_active_count, _future_count, _done_count = get_sorted_views().counts(_now)
 _total = len(st.session_state.tasks)
 _rate = round((_done_count/_total)*100) if _total > 0 else 0
 
@@ -456,7 +2695,7 @@ with sf_col1:
     search_input = st.text_input(
         "Search",
         value=st.session_state.search_query,
-        placeholder="Search tasks by name or category...",
+        placeholder='Search, or filter: priority:high category:work due:<=tomorrow overdue:true "client call"',
         label_visibility="collapsed",
         key="search_input"
     )
@@ -490,9 +2729,16 @@ if filters_active:
     </div>
     """, unsafe_allow_html=True)
 
+# Compile the search box once per rerun; it is reused for the results list and the tabs
+try:
+    search_plan = compile_query(st.session_state.search_query, clock_today())
+except ValueError as e:
+    st.error(f"Invalid filter: {e}")
+    search_plan = compile_query("", clock_today())
+
 # ----- SEARCH RESULTS WITH EDIT/DELETE -----
 if st.session_state.search_query:
-    search_results = search_tasks(st.session_state.tasks, st.session_state.search_query)
+    search_results = run_query(search_plan)
     if search_results:
         st.markdown(f"""
         <div style='background: #f0fdf4; padding: 0.75rem 1rem; border-radius: 8px; 
@@ -516,8 +2762,8 @@ if st.session_state.search_query:
                     st.markdown(f"**{task['task']}** {status_badge}")
                     st.markdown(f"""
                     <span style='background:{cat_color};color:white;padding:2px 8px;
-                    border-radius:10px;font-size:0.75rem;'>{task.get('category', 'General')}</span>
-                    <span style='color:#64748b;font-size:0.85rem;'> 📅 {task['scheduled_date']}</span>
+                    border-radius:10px;font-size:0.75rem;'>{html.escape(str(task.get('category', 'General')))}</span>
+                    <span style='color:#64748b;font-size:0.85rem;'> 📅 {html.escape(str(task['scheduled_date']))}</span>
                     """, unsafe_allow_html=True)
                 
                 with rc3:
@@ -542,7 +2788,8 @@ if st.session_state.search_query:
                                                    index=["Low", "Medium", "High"].index(task['priority']))
                         with e_col2:
                             edit_cat = st.selectbox("Category", CATEGORIES,
-                                                   index=CATEGORIES.index(task.get('category', 'General')))
+                                                   index=CATEGORIES.index(task['category'])
+                                                   if task.get('category') in CATEGORIES else 0)
                         
                         e_col3, e_col4 = st.columns(2)
                         with e_col3:
@@ -575,17 +2822,22 @@ st.markdown("---")
 # ----- FILTER TASKS FOR TABS -----
 filtered_tasks = st.session_state.tasks
 
-if st.session_state.search_query:
-    filtered_tasks = search_tasks(filtered_tasks, st.session_state.search_query)
-
 if st.session_state.selected_category != "All":
-    filtered_tasks = [t for t in filtered_tasks 
-                      if t.get('category', 'General') == st.session_state.selected_category]
+    category_filter = f'category:"{st.session_state.selected_category}"'
+    try:
+        search_plan = compile_query(f"{st.session_state.search_query} {category_filter}", clock_today())
+    except ValueError:
+        search_plan = compile_query(category_filter, clock_today())
+
+if st.session_state.search_query or st.session_state.selected_category != "All":
+    filtered_tasks = run_query(search_plan)
 
-pending = [t for t in filtered_tasks if t['status'] == 'pending']
-active_tasks = [t for t in pending if is_task_active(t)]
-future_tasks = [t for t in pending if is_task_future(t)]
-completed_tasks = [t for t in filtered_tasks if t['status'] == 'completed']
+# Tabs read pre-sorted views; filters only narrow them by id
+_filter_ids = None if filtered_tasks is st.session_state.tasks else {t['id'] for t in filtered_tasks}
+_views = get_sorted_views()
+active_tasks = _views.active(_now, _filter_ids)
+future_tasks = _views.upcoming(_now, _filter_ids)
+completed_tasks = _views.done(_filter_ids)
 
 # ----- TAB PERSISTENCE -----
 # Get active tab from query params
@@ -615,32 +2867,29 @@ tab1, tab2, tab3, tab4, tab5 = st.tabs([
 
 # ----- TAB 1: ACTIVE TASKS -----
 with tab1:
+    do_next = get_task_ranker().top(DO_NEXT_COUNT, _now)
+    if do_next:
+        with st.expander(f"🎯 Do next ({len(do_next)})", expanded=False):
+            for rank, (task, score) in enumerate(do_next, 1):
+                p_icon = PRIORITY_ICONS.get(task['priority'], '🟡')
+                st.markdown(f"{rank}. {p_icon} **{task['task']}** · {task.get('category', 'General')} · "
+                            f"📅 {task['scheduled_date']} {task['start_time']}-{task['end_time']} · score {score:.0f}")
+    
     if not active_tasks:
         col_gif, col_msg = st.columns([0.4, 0.6])
         with col_gif:
-            st.image(GIFS['empty_active'], width=300)
+            show_gif('empty_active')
         with col_msg:
             st.markdown("### 🎉 You're all caught up!")
             st.markdown("No active tasks right now. Time to relax!")
             st.markdown("💡 **Tip:** Use Quick Add above to create a task")
     else:
-        active_sorted = sorted(active_tasks, key=lambda x: (
-            not is_task_overdue(x), PRIORITY_ORDER.get(x['priority'], 4)
-        ))
-        
-        for task in active_sorted:
+        for task, overdue in active_tasks[:st.session_state.tab_page_size]:
             p_icon = PRIORITY_ICONS.get(task['priority'], '🟡')
-            overdue_badge = "🚨 **OVERDUE**" if is_task_overdue(task) else ""
-            cat_color = get_category_color(task.get('category', 'General'))
+            card_box, card_title, card_meta = render_active_card(task, overdue)
             
             # Task card
-            st.markdown(f"""
-            <div style='background: {"#fef2f2" if is_task_overdue(task) else "#ffffff"}; 
-                        padding: 1rem; border-radius: 10px; 
-                        border: 1px solid {"#fecaca" if is_task_overdue(task) else "#e2e8f0"};
-                        margin-bottom: 0.5rem;'>
-            </div>
-            """, unsafe_allow_html=True)
+            st.markdown(card_box, unsafe_allow_html=True)
             
             c1, c2, c3, c4 = st.columns([0.05, 0.55, 0.2, 0.2])
             
@@ -648,12 +2897,8 @@ with tab1:
                 st.markdown(f"### {p_icon}")
             
             with c2:
-                st.markdown(f"**{task['task']}** {overdue_badge}")
-                st.markdown(f"""
-                <span style='background:{cat_color};color:white;padding:2px 10px;
-                border-radius:12px;font-size:0.8rem;font-weight:500;'>{task.get('category', 'General')}</span>
-                <span style='color:#64748b;margin-left:10px;'>📅 {task['scheduled_date']} • 🕐 {task['start_time']}-{task['end_time']}</span>
-                """, unsafe_allow_html=True)
+                st.markdown(card_title)
+                st.markdown(card_meta, unsafe_allow_html=True)
             
             with c3:
                 if st.button("✅ Complete", key=f"done_{task['id']}", use_container_width=True):
@@ -686,7 +2931,8 @@ with tab1:
                                               index=["Low", "Medium", "High"].index(task['priority']))
                     with ec2:
                         new_cat = st.selectbox("Category", CATEGORIES,
-                                              index=CATEGORIES.index(task.get('category', 'General')))
+                                              index=CATEGORIES.index(task['category'])
+                                              if task.get('category') in CATEGORIES else 0)
                     
                     new_date = st.date_input("Date", 
                         value=datetime.strptime(task['scheduled_date'], "%Y-%m-%d").date())
@@ -718,6 +2964,13 @@ with tab1:
                             st.rerun()
             
             st.markdown("---")
+        
+        if len(active_tasks) > st.session_state.tab_page_size:
+            if st.button(f"⬇️ Show more ({len(active_tasks) - st.session_state.tab_page_size} hidden)",
+                         key="more_active", use_container_width=True):
+                st.session_state.tab_page_size += TASK_PAGE_SIZE
+                st.query_params['tab'] = '0'
+                st.rerun()
 
 
 # ----- TAB 2: UPCOMING TASKS -----
@@ -725,23 +2978,19 @@ with tab2:
     if not future_tasks:
         col_gif, col_msg = st.columns([0.4, 0.6])
         with col_gif:
-            st.image(GIFS['empty_upcoming'], width=300)
+            show_gif('empty_upcoming')
         with col_msg:
             st.markdown("### 📭 Nothing scheduled!")
             st.markdown("Plan ahead and stay organized.")
             st.markdown("💡 **Tip:** Try 'Meeting tomorrow 2pm'")
     else:
-        future_sorted = sorted(future_tasks,
-            key=lambda x: datetime.strptime(f"{x['scheduled_date']} {x['start_time']}", "%Y-%m-%d %H:%M"))
-        
-        for task in future_sorted:
+        for task in future_tasks[:st.session_state.tab_page_size]:
             p_icon = PRIORITY_ICONS.get(task['priority'], '🟡')
-            cat_color = get_category_color(task.get('category', 'General'))
             
-            task_dt = datetime.strptime(f"{task['scheduled_date']} {task['start_time']}", "%Y-%m-%d %H:%M")
-            delta = task_dt - datetime.now()
+            delta = get_task_interval(task)[0] - _now
             days, hours = delta.days, delta.seconds // 3600
             time_str = f"⏰ in {days}d {hours}h" if days > 0 else f"⏰ in {hours}h"
+            card_title, card_meta = render_upcoming_card(task, time_str)
             
             c1, c2, c3, c4 = st.columns([0.05, 0.55, 0.2, 0.2])
             
@@ -749,12 +2998,8 @@ with tab2:
                 st.markdown(f"### {p_icon}")
             
             with c2:
-                st.markdown(f"**{task['task']}**")
-                st.markdown(f"""
-                <span style='background:{cat_color};color:white;padding:2px 10px;
-                border-radius:12px;font-size:0.8rem;'>{task.get('category', 'General')}</span>
-                <span style='color:#64748b;margin-left:10px;'>📅 {task['scheduled_date']} • {time_str}</span>
-                """, unsafe_allow_html=True)
+                st.markdown(card_title)
+                st.markdown(card_meta, unsafe_allow_html=True)
             
             with c3:
                 if st.button("✅ Done", key=f"fdone_{task['id']}", use_container_width=True):
@@ -769,6 +3014,13 @@ with tab2:
                     st.rerun()
             
             st.markdown("---")
+        
+        if len(future_tasks) > st.session_state.tab_page_size:
+            if st.button(f"⬇️ Show more ({len(future_tasks) - st.session_state.tab_page_size} hidden)",
+                         key="more_upcoming", use_container_width=True):
+                st.session_state.tab_page_size += TASK_PAGE_SIZE
+                st.query_params['tab'] = '1'
+                st.rerun()
 
 
 # ----- TAB 3: COMPLETED TASKS -----
@@ -776,7 +3028,7 @@ with tab3:
     if not completed_tasks:
         col_gif, col_msg = st.columns([0.4, 0.6])
         with col_gif:
-            st.image(GIFS['empty_done'], width=300)
+            show_gif('empty_done')
         with col_msg:
             st.markdown("### 💪 Time to get productive!")
             st.markdown("Complete tasks and they'll appear here.")
@@ -789,7 +3041,7 @@ with tab3:
         available_cols = [c for c in display_cols if c in df.columns]
         
         st.dataframe(
-            df[available_cols].sort_values(by='completed_at' if 'completed_at' in df.columns else 'scheduled_date', ascending=False),
+            df[available_cols],
             use_container_width=True,
             hide_index=True
         )
@@ -829,26 +3081,38 @@ with tab4:
         
         if rate >= 80:
             with ins_col1:
-                st.image(GIFS['celebrate_high'], width=300)
+                show_gif('celebrate_high')
             with ins_col2:
                 st.success(f"🌟 AMAZING! {rate}% completion rate!")
                 st.markdown("You're crushing it! Keep up the momentum! 🔥")
         elif rate >= 50:
             with ins_col1:
-                st.image(GIFS['celebrate_medium'], width=300)
+                show_gif('celebrate_medium')
             with ins_col2:
                 st.warning(f"📈 Good progress at {rate}%!")
                 st.markdown("You're on the right track! Keep pushing! 💪")
         else:
             with ins_col1:
-                st.image(GIFS['motivate_low'], width=300)
+                show_gif('motivate_low')
             with ins_col2:
                 st.info(f"🚀 Currently at {rate}% - Let's boost that!")
                 st.markdown("Every task completed is a win! You got this! 🎯")
+        
+        _focus = get_focus_log()
+        if _focus.sessions:
+            st.markdown("---")
+            st.markdown("#### 🍅 Focus Time")
+            f1, f2, f3 = st.columns(3)
+            f1.metric("🍅 Sessions", _focus.sessions)
+            f2.metric("⏱️ Focused", f"{round(sum(_focus.minutes_by_day.values()) / 60, 1)}h")
+            _last_days = [(clock_today() - timedelta(days=d)).isoformat() for d in range(6, -1, -1)]
+            f3.metric("📅 Last 7 Days", f"{round(sum(_focus.minutes_by_day.get(d, 0) for d in _last_days) / 60, 1)}h")
+            st.dataframe(pd.DataFrame(focus_report(st.session_state.tasks, _focus)),
+                         use_container_width=True, hide_index=True)
     else:
         col_gif, col_msg = st.columns([0.4, 0.6])
         with col_gif:
-            st.image(GIFS['empty_analytics'], width=300)
+            show_gif('empty_analytics')
         with col_msg:
             st.markdown("### 📊 No data yet!")
             st.markdown("Add and complete tasks to see analytics.")
@@ -879,13 +3143,13 @@ with tab5:
             with m_col2:
                 m_category = st.selectbox("Category", CATEGORIES, key="m_cat")
             
-            m_date = st.date_input("Date", value=date.today(), key="m_date")
+            m_date = st.date_input("Date", value=clock_today(), key="m_date")
             
             m_col3, m_col4 = st.columns(2)
             with m_col3:
-                m_start = st.time_input("Start Time", value=datetime.now().time(), key="m_start")
+                m_start = st.time_input("Start Time", value=clock_now().time(), key="m_start")
             with m_col4:
-                m_end = st.time_input("End Time", value=(datetime.now() + timedelta(hours=1)).time(), key="m_end")
+                m_end = st.time_input("End Time", value=(clock_now() + timedelta(hours=1)).time(), key="m_end")
             
             if st.form_submit_button("➕ Add Task", use_container_width=True):
                 if m_task:
@@ -898,6 +3162,25 @@ with tab5:
         
         st.markdown("---")
         
+        # Day View Conflicts
+        st.markdown("""
+        <div style='background: #fffbeb; padding: 1rem; border-radius: 10px; margin-bottom: 1rem;'>
+            <h4 style='margin: 0; color: #b45309;'>📆 Schedule Conflicts</h4>
+            <p style='margin: 0.25rem 0 0 0; color: #64748b; font-size: 0.85rem;'>Overlapping pending tasks for a day</p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        conflict_day = st.date_input("Day", value=clock_today(), key="conflict_day")
+        day_conflicts = get_interval_index().day_conflicts(conflict_day)
+        if day_conflicts:
+            for first, second in day_conflicts:
+                st.warning(f"⚠️ **{first['task']}** ({first['start_time']}-{first['end_time']}) overlaps "
+                           f"**{second['task']}** ({second['start_time']}-{second['end_time']})")
+        else:
+            st.success("No overlapping tasks on this day")
+        
+        st.markdown("---")
+        
         # Pomodoro Timer
         st.markdown("""
         <div style='background: #fef2f2; padding: 1rem; border-radius: 10px; margin-bottom: 1rem;'>
@@ -906,6 +3189,17 @@ with tab5:
         </div>
         """, unsafe_allow_html=True)
         
+        _focus_choices = {None: "— No task —"}
+        _focus_choices.update((task['id'], task['task']) for task, _ in get_task_ranker().top(20, _now))
+        if st.session_state.pomodoro_task_id not in _focus_choices:
+            _focus_task = next((t for t in st.session_state.tasks if t['id'] == st.session_state.pomodoro_task_id), None)
+            _focus_choices[st.session_state.pomodoro_task_id] = _focus_task['task'] if _focus_task else "(deleted task)"
+        st.session_state.pomodoro_task_id = st.selectbox(
+            "Focus on", list(_focus_choices), format_func=_focus_choices.get,
+            index=list(_focus_choices).index(st.session_state.pomodoro_task_id),
+            disabled=st.session_state.pomodoro_active, key="pom_task"
+        )
+        
         pom_col1, pom_col2 = st.columns([0.6, 0.4])
         with pom_col1:
             st.session_state.pomodoro_duration = st.number_input(
@@ -918,28 +3212,32 @@ with tab5:
                 remaining = get_pomodoro_time_remaining()
                 if remaining > 0:
                     if st.button("⏹️ Stop", use_container_width=True, key="pom_stop"):
+                        get_focus_log().stop(clock_now())
                         st.session_state.pomodoro_active = False
                         st.session_state.pomodoro_start_time = None
                         st.query_params['tab'] = '4'
                         st.rerun()
                 else:
+                    get_focus_log().stop(clock_now())
                     st.balloons()
                     st.session_state.pomodoro_active = False
             else:
                 if st.button("▶️ Start", use_container_width=True, type="primary", key="pom_start"):
+                    get_focus_log().start(st.session_state.pomodoro_task_id,
+                                          st.session_state.pomodoro_duration, clock_now())
                     st.session_state.pomodoro_active = True
-                    st.session_state.pomodoro_start_time = datetime.now()
+                    st.session_state.pomodoro_start_time = clock_now()
                     st.query_params['tab'] = '4'
                     st.rerun()
         
         if st.session_state.pomodoro_active:
             remaining = get_pomodoro_time_remaining()
             if remaining > 0:
-                st.image(GIFS['pomodoro_focus'], width=300)
+                show_gif('pomodoro_focus')
                 st.success(f"⏱️ {int(remaining)} minutes remaining - Stay focused!")
                 st.progress(1 - (remaining / st.session_state.pomodoro_duration))
             else:
-                st.image(GIFS['pomodoro_break'], width=300)
+                show_gif('pomodoro_break')
                 st.success("🎉 Time's up! Take a break!")
     
     with tool_col2:
@@ -951,9 +3249,12 @@ with tab5:
         </div>
         """, unsafe_allow_html=True)
         
-        templates = load_templates()
+        _template_registry = get_template_registry()
+        templates = _template_registry.get()
+        for _error in _template_registry.errors:
+            st.warning(f"Skipped template {_error}")
         tpl_name = st.selectbox("Select Template", list(templates.keys()), key="tpl_select")
-        tpl_date = st.date_input("Schedule Date", value=date.today(), key="tpl_date")
+        tpl_date = st.date_input("Schedule From", value=clock_today(), key="tpl_date")
         
         if st.button("✨ Create from Template", use_container_width=True, key="tpl_create"):
             count = create_tasks_from_template(tpl_name, templates, tpl_date)
@@ -962,6 +3263,43 @@ with tab5:
                 st.query_params['tab'] = '4'
                 st.rerun()
         
+        with st.expander("✏️ New / Edit Template"):
+            _editing = templates.get(tpl_name) if st.checkbox(f"Edit '{tpl_name}'", key="tpl_edit_mode") and tpl_name else None
+            _base = _editing or {"tasks": [], "category": "General", "priority": "Medium", "duration": 1.0}
+            with st.form("tpl_form"):
+                t_name = st.text_input("Name", value=tpl_name if _editing else "")
+                t_tasks = st.text_area("Tasks (one per line)", value="\n".join(_base['tasks']))
+                tc1, tc2, tc3 = st.columns(3)
+                with tc1:
+                    t_category = st.selectbox("Category", CATEGORIES,
+                                              index=CATEGORIES.index(_base['category']) if _base['category'] in CATEGORIES else 0)
+                with tc2:
+                    t_priority = st.selectbox("Priority", list(PRIORITY_ORDER), index=list(PRIORITY_ORDER).index(_base['priority']))
+                with tc3:
+                    t_duration = st.number_input("Hours each", min_value=0.25, max_value=float(TEMPLATE_MAX_HOURS),
+                                                 value=float(_base['duration']), step=0.25)
+                ts1, ts2 = st.columns(2)
+                with ts1:
+                    t_save = st.form_submit_button("💾 Save Template", use_container_width=True)
+                with ts2:
+                    t_delete = st.form_submit_button("🗑️ Delete", use_container_width=True, disabled=not _editing)
+            if t_save:
+                try:
+                    _template_registry.save(t_name.strip(), {
+                        "tasks": [line for line in t_tasks.splitlines() if line.strip()],
+                        "category": t_category, "priority": t_priority, "duration": t_duration,
+                    }, old_name=tpl_name if _editing else None)
+                    st.toast(f"💾 Saved template: {t_name.strip()}")
+                    st.query_params['tab'] = '4'
+                    st.rerun()
+                except ValueError as e:
+                    st.error(f"Template not saved: {e}")
+            if t_delete and _editing:
+                _template_registry.delete(tpl_name)
+                st.toast(f"🗑️ Deleted template: {tpl_name}")
+                st.query_params['tab'] = '4'
+                st.rerun()
+        
         st.markdown("---")
         
         # Data Management
@@ -975,18 +3313,53 @@ with tab5:
         st.download_button(
             "⬇️ Export Backup",
             json.dumps(export_data(), indent=2),
-            file_name=f"tusk_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            file_name=f"tusk_backup_{clock_now().strftime('%Y%m%d_%H%M%S')}.json",
             mime="application/json",
             use_container_width=True,
             key="export_btn"
         )
         
+        _ics_scope = st.radio("Calendar export", ["All tasks", "Current filter"], horizontal=True, key="ics_scope")
+        # Streamed to a temp file only on request, and kept until the data or the filter changes
+        _ics_key = (st.session_state.workspace, get_change_feed().seq, clock_today(), None if _ics_scope == "All tasks"
+                    else (st.session_state.search_query, st.session_state.selected_category))
+        _ics_export = st.session_state.get('ics_export')
+        if _ics_export and (_ics_export[0] != _ics_key or not os.path.exists(_ics_export[1])):
+            if os.path.exists(_ics_export[1]):
+                os.remove(_ics_export[1])
+            st.session_state.ics_export = _ics_export = None
+        if _ics_export is None and st.button("📅 Prepare Calendar Export", use_container_width=True,
+                                             key="prepare_ics_btn"):
+            _ics_tasks = st.session_state.tasks if _ics_scope == "All tasks" else filtered_tasks
+            st.session_state.ics_export = _ics_export = (_ics_key, *export_calendar(_ics_tasks))
+        if _ics_export:
+            with open(_ics_export[1], 'rb') as _ics_file:
+                st.download_button(
+                    f"📅 Export Calendar ({_ics_export[2]} events)",
+                    _ics_file,
+                    file_name=f"tusk_{clock_today().strftime('%Y%m%d')}.ics",
+                    mime="text/calendar",
+                    use_container_width=True,
+                    key="export_ics_btn"
+                )
+        
+        uploaded_ics = st.file_uploader("Import Calendar (.ics)", type=['ics'], key="import_ics")
+        if uploaded_ics and st.session_state.get('ics_imported') != uploaded_ics.file_id:
+            try:
+                _created, _updated = import_calendar(io.TextIOWrapper(uploaded_ics, encoding="utf-8", newline=""))
+                st.session_state.ics_imported = uploaded_ics.file_id
+                st.success(f"📅 Imported {_created} new and {_updated} updated tasks")
+            except (UnicodeDecodeError, ValueError) as e:
+                st.error(f"Calendar import failed: {e}")
+        
         uploaded = st.file_uploader("Import Backup", type=['json'], key="import_file")
-        if uploaded:
+        # The attached file stays in the uploader across reruns; import it only once
+        if uploaded and st.session_state.get('backup_imported') != uploaded.file_id:
             try:
-                success, msg = import_data(json.load(uploaded))
+                success, msg = import_records(iter_task_records(io.TextIOWrapper(uploaded, encoding="utf-8")))
                 if success:
-                    st.success(msg)
+                    st.session_state.backup_imported = uploaded.file_id
+                    st.toast(msg)
                     st.rerun()
                 else:
                     st.error(msg)
@@ -1001,132 +3374,36 @@ with tab5:
             <h4 style='margin: 0; color: #dc2626;'>🚨 Danger Zone</h4>
         </div>
         """, unsafe_allow_html=True)
+
+        if RETENTION_DAYS or RETENTION_MAX_COMPLETED:
+            _rules = [f"older than {RETENTION_DAYS} days"] if RETENTION_DAYS else []
+            _rules += [f"beyond the newest {RETENTION_MAX_COMPLETED}"] if RETENTION_MAX_COMPLETED else []
+            st.caption(f"🧹 Completed tasks {' or '.join(_rules)} are "
+                       f"{'archived' if RETENTION_MODE == 'archive' else 'removed'} automatically")
         
         if st.button("🗑️ Clear Completed", use_container_width=True, key="clear_done"):
-            before = len(st.session_state.tasks)
+            cleared = [t for t in st.session_state.tasks if t['status'] == 'completed']
+            cleared_ids = [t['id'] for t in cleared]
             st.session_state.tasks = [t for t in st.session_state.tasks if t['status'] != 'completed']
-            save_tasks(st.session_state.tasks)
-            st.success(f"Cleared {before - len(st.session_state.tasks)} completed tasks")
+            commit_tasks(deletes=cleared_ids)
+            reset_indexes()
+            log_operation(f"Clear {len(cleared)} completed tasks", redo=([], cleared_ids), undo=(cleared, []))
+            st.success(f"Cleared {len(cleared)} completed tasks")
             st.query_params['tab'] = '4'
             st.rerun()
         
         if st.button("🚨 Clear ALL Tasks", use_container_width=True, key="clear_all"):
+            cleared = st.session_state.tasks
             st.session_state.tasks = []
-            save_tasks(st.session_state.tasks)
+            commit_tasks(deletes=[t['id'] for t in cleared])
+            reset_indexes()
+            log_operation(f"Clear all {len(cleared)} tasks", redo=([], [t['id'] for t in cleared]), undo=(cleared, []))
             st.warning("All tasks cleared!")
             st.query_params['tab'] = '4'
             st.rerun()
 
 
 # ============================================================
-# SECTION 11: CSS STYLES
+# SECTION 24: CSS STYLES
 # ============================================================
-st.markdown("""
-<style>
-    /* Hide Streamlit defaults */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
-    
-    /* Hide sidebar */
-    [data-testid="stSidebar"], [data-testid="collapsedControl"] {
-        display: none !important;
-    }
-    
-    /* Clean white background */
-    .stApp {
-        background: #ffffff;
-    }
-    
-    /* Better typography */
-    h1, h2, h3, h4 {
-        font-family: 'Segoe UI', system-ui, sans-serif;
-    }
-    
-    /* Styled tabs */
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 8px;
-        background: #f8fafc;
-        padding: 0.5rem;
-        border-radius: 12px;
-    }
-    
-    .stTabs [data-baseweb="tab-list"] button {
-        font-size: 15px;
-        font-weight: 600;
-        padding: 12px 24px;
-        border-radius: 8px;
-        background: transparent;
-    }
-    
-    .stTabs [data-baseweb="tab-list"] button[aria-selected="true"] {
-        background: #0ea5e9;
-        color: white;
-    }
-    
-    /* Metric styling */
-    div[data-testid="stMetricValue"] {
-        font-size: 2rem;
-        font-weight: 700;
-        color: #0ea5e9;
-    }
-    
-    div[data-testid="stMetricLabel"] {
-        font-size: 0.9rem;
-        font-weight: 600;
-    }
-    
-    /* Button styling */
-    .stButton button {
-        border-radius: 10px;
-        font-weight: 600;
-        transition: all 0.2s;
-    }
-    
-    .stButton button:hover {
-        transform: translateY(-1px);
-        box-shadow: 0 4px 12px rgba(0,0,0,0.15);
-    }
-    
-    .stButton button[kind="primary"] {
-        background: linear-gradient(135deg, #0ea5e9 0%, #0284c7 100%);
-    }
-    
-    /* Input styling */
-    .stTextInput input {
-        border-radius: 10px;
-        border: 2px solid #e2e8f0;
-        padding: 0.75rem;
-        font-size: 1rem;
-    }
-    
-    .stTextInput input:focus {
-        border-color: #0ea5e9;
-        box-shadow: 0 0 0 3px rgba(14, 165, 233, 0.1);
-    }
-    
-    /* Select styling */
-    .stSelectbox > div > div {
-        border-radius: 10px;
-    }
-    
-    /* Progress bar */
-    .stProgress > div > div {
-        background: linear-gradient(90deg, #0ea5e9 0%, #06b6d4 100%);
-        border-radius: 10px;
-    }
-    
-    /* Divider */
-    hr {
-        border: none;
-        border-top: 1px solid #e2e8f0;
-        margin: 1rem 0;
-    }
-    
-    /* DataFrames */
-    .stDataFrame {
-        border-radius: 10px;
-        overflow: hidden;
-    }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(load_stylesheet(), unsafe_allow_html=True)
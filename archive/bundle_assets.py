@@ -0,0 +1,97 @@
+# ============================================================
+# TUSK - Asset Bundler
+# Downloads the GIFs listed in assets/manifest.json into assets/gifs/
+# (untracked) under content-hashed names, and records them in the generated
+# assets/gifs/bundle.json. The Streamlit app serves those local copies;
+# without them it shows emoji art, so it never needs the network at runtime.
+#
+# Usage: python bundle_assets.py [--force]
+# ============================================================
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import urllib.request
+
+
+# ============================================================
+# SECTION 1: BUNDLING
+# ============================================================
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+MANIFEST_FILE = os.path.join(ASSETS_DIR, "manifest.json")
+GIFS_DIR = os.path.join(ASSETS_DIR, "gifs")
+BUNDLE_FILE = os.path.join(GIFS_DIR, "bundle.json")
+TIMEOUT_SECONDS = 30
+
+
+def load_manifest(path=MANIFEST_FILE):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_bundle(path=BUNDLE_FILE):
+    """{key: file name in GIFS_DIR} of the GIFs bundled so far"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_bundle(bundle, path=BUNDLE_FILE):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(bundle, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def hashed_name(key, data, extension):
+    """'empty_done', b'...' -> 'empty_done.3f2a9c1b0d4e.gif'"""
+    return f"{key}.{hashlib.sha256(data).hexdigest()[:12]}{extension}"
+
+
+def bundle_asset(key, entry, current=None, force=False):
+    """Download one asset unless its bundled copy is present; returns the new file name or None"""
+    if current and not force and os.path.exists(os.path.join(GIFS_DIR, current)):
+        return None
+    with urllib.request.urlopen(entry['url'], timeout=TIMEOUT_SECONDS) as response:
+        data = response.read()
+    extension = os.path.splitext(entry['url'])[1] or ".gif"
+    name = hashed_name(key, data, extension)
+    os.makedirs(GIFS_DIR, exist_ok=True)
+    with open(os.path.join(GIFS_DIR, name), 'wb') as f:
+        f.write(data)
+    if current and current != name and os.path.exists(os.path.join(GIFS_DIR, current)):
+        os.remove(os.path.join(GIFS_DIR, current))
+    return name
+
+
+# ============================================================
+# SECTION 2: COMMAND LINE
+# ============================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bundle TUSK's GIFs locally for offline use")
+    parser.add_argument("--force", action="store_true", help="download again even if bundled")
+    args = parser.parse_args(argv)
+    manifest = load_manifest()
+    bundle = load_bundle()
+    failed = 0
+    for key, entry in manifest['gifs'].items():
+        try:
+            name = bundle_asset(key, entry, bundle.get(key), args.force)
+        except OSError as e:
+            print(f"{key}: download failed: {e}", file=sys.stderr)
+            failed += 1
+            continue
+        if name:
+            bundle[key] = name
+        print(f"{key}: {name or 'already bundled'}")
+    os.makedirs(GIFS_DIR, exist_ok=True)
+    save_bundle({key: name for key, name in bundle.items() if key in manifest['gifs']})
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
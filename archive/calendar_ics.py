@@ -0,0 +1,309 @@
+# ============================================================
+# TUSK - Calendar Bridge
+# Streams tasks to iCalendar (.ics) and calendar events back into task
+# records with the same fields add_task fills in
+#
+# Usage: python calendar_ics.py export <tasks.json> <calendar.ics>
+#        python calendar_ics.py import <calendar.ics> <backup.json>
+# ============================================================
+
+import argparse
+import re
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from schema_bridge import iter_task_records, to_python_task, write_python_backup
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9: TZID times are read as local time
+    ZoneInfo = None
+
+
+# ============================================================
+# SECTION 1: ICS WRITER
+# ============================================================
+PRODID = "-//TUSK//Smart Task Manager//EN"
+UID_SUFFIX = "@tusk"
+ICS_PRIORITIES = {"High": 1, "Medium": 5, "Low": 9}
+LINE_OCTETS = 75
+
+
+def escape_text(value):
+    return (value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def fold(line):
+    """Split a content line into CRLF-terminated chunks of at most 75 octets"""
+    data = line.encode("utf-8")
+    if len(data) <= LINE_OCTETS:
+        return line + "\r\n"
+    chunks, start, limit = [], 0, LINE_OCTETS
+    while start < len(data):
+        end = min(start + limit, len(data))
+        while end < len(data) and (data[end] & 0xC0) == 0x80:  # don't split a UTF-8 sequence
+            end -= 1
+        chunks.append(data[start:end].decode("utf-8"))
+        start, limit = end, LINE_OCTETS - 1
+    return "\r\n ".join(chunks) + "\r\n"
+
+
+def task_event_lines(task, stamp):
+    """Content lines of one VEVENT; times are floating local time like the app's"""
+    start = datetime.strptime(f"{task['scheduled_date']} {task['start_time']}", "%Y-%m-%d %H:%M")
+    end = datetime.strptime(f"{task['scheduled_date']} {task['end_time']}", "%Y-%m-%d %H:%M")
+    if end <= start:
+        end += timedelta(days=1)
+    yield "BEGIN:VEVENT"
+    yield f"UID:{task['id']}{UID_SUFFIX}"
+    yield f"DTSTAMP:{stamp}"
+    yield f"DTSTART:{start:%Y%m%dT%H%M%S}"
+    yield f"DTEND:{end:%Y%m%dT%H%M%S}"
+    yield f"SUMMARY:{escape_text(task['task'])}"
+    yield f"CATEGORIES:{escape_text(task.get('category', 'General'))}"
+    yield f"PRIORITY:{ICS_PRIORITIES.get(task.get('priority'), 5)}"
+    yield f"X-TUSK-STATUS:{task.get('status', 'pending')}"
+    yield "END:VEVENT"
+
+
+def iter_ics(tasks):
+    """Yield the calendar as folded text lines, one task at a time"""
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    yield fold("BEGIN:VCALENDAR")
+    yield fold("VERSION:2.0")
+    yield fold(f"PRODID:{PRODID}")
+    yield fold("CALSCALE:GREGORIAN")
+    for task in tasks:
+        try:
+            lines = list(task_event_lines(task, stamp))
+        except (KeyError, TypeError, ValueError):
+            continue  # no usable date/time
+        for line in lines:
+            yield fold(line)
+    yield fold("END:VCALENDAR")
+
+
+def write_ics(tasks, out):
+    """Stream tasks to out as an .ics calendar; returns the number of events written"""
+    count = 0
+    for line in iter_ics(tasks):
+        out.write(line)
+        count += line == "BEGIN:VEVENT\r\n"
+    return count
+
+
+# ============================================================
+# SECTION 2: STREAMING ICS READER
+# ============================================================
+EVENT_COMPONENTS = ("VEVENT", "VTODO")
+
+
+def unfold(lines):
+    """Join folded continuation lines; yields logical content lines"""
+    current = None
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def parse_content_line(line):
+    """'DTSTART;TZID=Europe/Paris:20260302T090000' -> ('DTSTART', {'TZID': 'Europe/Paris'}, '2026...')"""
+    in_quotes = False
+    for i, char in enumerate(line):
+        if char == '"':
+            in_quotes = not in_quotes
+        elif char == ':' and not in_quotes:
+            head, value = line[:i], line[i + 1:]
+            break
+    else:
+        raise ValueError(f"Malformed content line: {line[:40]!r}")
+    name, *params = head.split(";")
+    return name.upper(), dict(p.partition("=")[::2] for p in params), value
+
+
+def iter_ics_components(lines):
+    """Yield (component, properties) for each event/to-do; properties map NAME -> [(params, value)].
+
+    Only the component being read is held in memory, so calendar size does
+    not matter.
+    """
+    component, props, depth = None, None, 0
+    for line in unfold(lines):
+        try:
+            name, params, value = parse_content_line(line)
+        except ValueError:
+            continue
+        if name == "BEGIN":
+            if component is None and value.upper() in EVENT_COMPONENTS:
+                component, props, depth = value.upper(), {}, 0
+            elif component is not None:
+                depth += 1  # nested VALARM etc.
+        elif name == "END" and component is not None:
+            if depth:
+                depth -= 1
+            else:
+                yield component, props
+                component = None
+        elif component is not None and not depth:
+            props.setdefault(name, []).append((params, value))
+
+
+# ============================================================
+# SECTION 3: EVENT MAPPING
+# ============================================================
+DEFAULT_START = "09:00"
+DEFAULT_DURATION = timedelta(hours=1)
+DURATION_PATTERN = re.compile(r'([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$')
+KNOWN_CATEGORIES = ("General", "Work", "Personal", "Health", "Learning", "Finance")
+
+
+def unescape_text(value):
+    return re.sub(r'\\([\\;,nN])', lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+
+def parse_ics_datetime(params, value):
+    """Local naive datetime, or a date for all-day values"""
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return datetime.strptime(value, "%Y%m%d").date()
+    moment = datetime.strptime(value.rstrip("Z"), "%Y%m%dT%H%M%S")
+    if value.endswith("Z"):
+        return moment.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    if params.get("TZID") and ZoneInfo is not None:
+        try:
+            zone = ZoneInfo(params["TZID"].strip('"'))
+        except (KeyError, ValueError):
+            return moment
+        return moment.replace(tzinfo=zone).astimezone().replace(tzinfo=None)
+    return moment
+
+
+def parse_ics_duration(value):
+    match = DURATION_PATTERN.match(value)
+    if not match:
+        raise ValueError(f"Bad duration {value!r}")
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    delta = timedelta(weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+                      minutes=int(minutes or 0), seconds=int(seconds or 0))
+    return -delta if sign == "-" else delta
+
+
+def _first(props, name):
+    values = props.get(name)
+    return values[0] if values else (None, None)
+
+
+def _ics_priority(value):
+    try:
+        level = int(value)
+    except (TypeError, ValueError):
+        return "Medium"
+    if 1 <= level <= 4:
+        return "High"
+    return "Low" if level >= 6 else "Medium"
+
+
+def component_to_task(component, props, now=None):
+    """Task record (the fields add_task fills in) for one event/to-do, or None if it has no date"""
+    start_params, start_value = _first(props, "DTSTART")
+    if start_value is None:
+        start_params, start_value = _first(props, "DUE")
+    if start_value is None:
+        return None
+    start = parse_ics_datetime(start_params, start_value)
+    all_day = not isinstance(start, datetime)
+    if all_day:
+        start = datetime.combine(start, datetime.strptime(DEFAULT_START, "%H:%M").time())
+    end_params, end_value = _first(props, "DTEND")
+    _, duration = _first(props, "DURATION")
+    if end_value and not all_day:
+        end = parse_ics_datetime(end_params, end_value)
+        end = end if isinstance(end, datetime) else start + DEFAULT_DURATION
+    elif duration and not all_day:
+        end = start + parse_ics_duration(duration)
+    else:
+        end = start + DEFAULT_DURATION
+    if end <= start:
+        end = start + DEFAULT_DURATION
+
+    _, uid = _first(props, "UID")
+    _, recurrence = _first(props, "RECURRENCE-ID")
+    if uid and uid.endswith(UID_SUFFIX) and not recurrence:
+        task_id = uid[:-len(UID_SUFFIX)]
+    else:
+        # Stable id per event, so importing the same calendar again updates instead of duplicating
+        key = f"{uid or start_value}|{recurrence or ''}"
+        task_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"ics:{key}"))
+
+    _, summary = _first(props, "SUMMARY")
+    _, categories = _first(props, "CATEGORIES")
+    category = "General"
+    for name in (unescape_text(c).strip() for c in re.split(r'(?<!\\),', categories or "")):
+        if name.title() in KNOWN_CATEGORIES:
+            category = name.title()
+            break
+    _, tusk_status = _first(props, "X-TUSK-STATUS")
+    _, status = _first(props, "STATUS")
+    completed = (tusk_status or "").lower() == "completed" or (status or "").upper() == "COMPLETED"
+
+    added_at = (now or datetime.now()).strftime("%Y-%m-%d %H:%M")
+    task = {
+        "id": task_id,
+        "task": unescape_text(summary).strip() if summary else "(untitled event)",
+        "priority": _ics_priority(_first(props, "PRIORITY")[1]),
+        "category": category,
+        "status": "completed" if completed else "pending",
+        "added_at": added_at,
+        "scheduled_date": start.date().isoformat(),
+        "start_time": start.strftime("%H:%M"),
+        "end_time": end.strftime("%H:%M"),
+    }
+    if completed:
+        task['completed_at'] = added_at
+    return task
+
+
+def iter_ics_tasks(lines, now=None):
+    """Yield a task record per dated event/to-do in an .ics stream"""
+    for component, props in iter_ics_components(lines):
+        try:
+            task = component_to_task(component, props, now)
+        except ValueError:
+            continue
+        if task is not None:
+            yield task
+
+
+# ============================================================
+# SECTION 4: COMMAND LINE
+# ============================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert between TUSK task files and iCalendar")
+    parser.add_argument("direction", choices=("export", "import"))
+    parser.add_argument("source", help="task file (export) or .ics calendar (import)")
+    parser.add_argument("destination", help=".ics calendar (export) or Python backup (import)")
+    args = parser.parse_args(argv)
+    try:
+        with open(args.source, 'r', encoding='utf-8') as src, \
+                open(args.destination, 'w', encoding='utf-8', newline='') as dst:
+            if args.direction == "export":
+                count = write_ics((to_python_task(r) for r in iter_task_records(src)), dst)
+            else:
+                count = write_python_backup(iter_ics_tasks(src), dst)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Conversion failed: {e}", file=sys.stderr)
+        return 1
+    print(f"{args.direction.capitalize()}ed {count} tasks -> {args.destination}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+# ============================================================
+# TUSK - Schema Bridge
+# Streams task records between the JS app format (demo-tasks.json,
+# localStorage exports) and the Streamlit app format (tasks_data.json)
+#
+# Usage: python schema_bridge.py <input.json> <output.json> --to js|python
+# ============================================================
+
+import argparse
+import json
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+
+# ============================================================
+# SECTION 1: RECORD MAPPING
+# ============================================================
+DEFAULT_START_TIME = "09:00"
+DEFAULT_DURATION = timedelta(hours=1)
+PRIORITIES = ("High", "Medium", "Low")
+
+
+def detect_schema(record):
+    """'python' for {task, status, ...} records, 'js' for {name, completed, ...} records"""
+    if 'task' in record or 'status' in record or 'scheduled_date' in record:
+        return 'python'
+    if 'name' in record or 'completed' in record or 'dueDate' in record:
+        return 'js'
+    raise ValueError(f"Unrecognised task record: {sorted(record)[:5]}")
+
+
+def _iso_to_local_minutes(value):
+    """'2026-01-29T10:00:00.000Z' -> '2026-01-29 11:00' in local time"""
+    moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if moment.tzinfo is not None:
+        moment = moment.astimezone()
+    return moment.strftime("%Y-%m-%d %H:%M")
+
+
+def _local_minutes_to_iso(value):
+    """'2026-01-29 11:00' local -> '2026-01-29T10:00:00.000Z'"""
+    moment = datetime.strptime(value, "%Y-%m-%d %H:%M").astimezone(timezone.utc)
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def js_to_python(record):
+    created = _iso_to_local_minutes(record['createdAt']) if record.get('createdAt') else \
+        datetime.now().strftime("%Y-%m-%d %H:%M")
+    start_time = record.get('dueTime') or DEFAULT_START_TIME
+    end_time = record.get('endTime') or (
+        datetime.strptime(start_time, "%H:%M") + DEFAULT_DURATION).strftime("%H:%M")
+    task = {
+        "id": str(record.get('id') or uuid.uuid4()),
+        "task": record['name'],
+        "priority": record.get('priority') if record.get('priority') in PRIORITIES else "Medium",
+        "category": record.get('category') or "General",
+        "status": "completed" if record.get('completed') else "pending",
+        "added_at": created,
+        "scheduled_date": record.get('dueDate') or created[:10],
+        "start_time": start_time,
+        "end_time": end_time,
+    }
+    if record.get('completed') and record.get('completedAt'):
+        task['completed_at'] = _iso_to_local_minutes(record['completedAt'])
+    if record.get('remembered'):
+        task['remembered'] = True
+    return task
+
+
+def python_to_js(task):
+    record = {
+        "id": task['id'],
+        "name": task['task'],
+        "priority": task.get('priority', "Medium"),
+        "category": task.get('category', "General"),
+        "dueDate": task.get('scheduled_date'),
+        "dueTime": task.get('start_time'),
+        "endTime": task.get('end_time'),
+        "completed": task.get('status') == 'completed',
+        "remembered": bool(task.get('remembered', False)),
+        "createdAt": _local_minutes_to_iso(task['added_at']) if task.get('added_at') else None,
+    }
+    if task.get('completed_at'):
+        record['completedAt'] = _local_minutes_to_iso(task['completed_at'])
+    return record
+
+
+def to_python_task(record):
+    return record if detect_schema(record) == 'python' else js_to_python(record)
+
+
+def to_js_task(record):
+    return record if detect_schema(record) == 'js' else python_to_js(record)
+
+
+# ============================================================
+# SECTION 2: STREAMING JSON READER / WRITERS
+# ============================================================
+CHUNK_SIZE = 64 * 1024
+
+
+class _JsonStream:
+    """Incremental reader that decodes one JSON value at a time from a text file"""
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self):
+        """Next non-whitespace character, or '' at end of input"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos:self.pos + 1]
+            self._fill()
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in JSON input")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self._fill()
+                continue
+            # A number at the buffer's edge may continue in the next chunk
+            if end == len(self.buf) and not self.eof:
+                self._fill()
+                continue
+            self.pos = end
+            return value
+
+    def array_items(self):
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ',':
+                self.pos += 1
+            else:
+                self.expect(']')
+                return
+
+
+def iter_task_records(f, chunk_size=CHUNK_SIZE):
+    """Yield raw task records from a JS array export or a Python {"tasks": [...]} backup.
+
+    Only one record is decoded at a time, so memory stays flat however large
+    the file is.
+    """
+    stream = _JsonStream(f, chunk_size)
+    if stream.peek() == '[':
+        yield from stream.array_items()
+        return
+    stream.expect('{')
+    found = False
+    while stream.peek() != '}':
+        key = stream.value()
+        stream.expect(':')
+        if key == 'tasks':
+            found = True
+            yield from stream.array_items()
+        else:
+            stream.value()
+        if stream.peek() == ',':
+            stream.pos += 1
+    stream.expect('}')
+    if not found:
+        raise ValueError('JSON object has no "tasks" array')
+
+
+def write_js_array(records, out):
+    """Stream records as the JS app's plain array export; returns the count written"""
+    count = 0
+    out.write("[")
+    for record in records:
+        out.write(",\n  " if count else "\n  ")
+        out.write(json.dumps(to_js_task(record)))
+        count += 1
+    out.write("\n]\n" if count else "]\n")
+    return count
+
+
+def write_python_backup(records, out):
+    """Stream records as a Streamlit app backup ({"tasks": [...]}); returns the count written"""
+    count = 0
+    out.write('{"export_date": %s, "version": "2.0", "tasks": [' % json.dumps(datetime.now().isoformat()))
+    for record in records:
+        out.write(",\n  " if count else "\n  ")
+        out.write(json.dumps(to_python_task(record)))
+        count += 1
+    out.write("\n]}\n" if count else "]}\n")
+    return count
+
+
+WRITERS = {'js': write_js_array, 'python': write_python_backup}
+
+
+def convert_file(src_path, dst_path, target):
+    with open(src_path, 'r', encoding='utf-8') as src, open(dst_path, 'w', encoding='utf-8') as dst:
+        return WRITERS[target](iter_task_records(src), dst)
+
+
+# ============================================================
+# SECTION 3: COMMAND LINE
+# ============================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert TUSK task files between the JS and Python formats")
+    parser.add_argument("source", help="JS array export or Python backup / tasks_data.json")
+    parser.add_argument("destination")
+    parser.add_argument("--to", choices=sorted(WRITERS), required=True, help="target format")
+    args = parser.parse_args(argv)
+    try:
+        count = convert_file(args.source, args.destination, args.to)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Conversion failed: {e}", file=sys.stderr)
+        return 1
+    print(f"Converted {count} tasks to {args.to} format -> {args.destination}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
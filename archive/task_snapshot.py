@@ -0,0 +1,112 @@
+# ============================================================
+# TUSK - Binary Task Snapshot
+# Compact, memory-mapped copy of a tasks_data.json file. The JSON file
+# stays the source of truth; the snapshot is rebuilt whenever it is stale.
+#
+# Layout (little endian):
+#   header        magic, format/marshal versions, record count, source
+#                 mtime_ns + size
+#   records       the task list, marshal-encoded
+# ============================================================
+
+import marshal
+import mmap
+import os
+import struct
+import threading
+
+
+# ============================================================
+# SECTION 1: FORMAT
+# ============================================================
+MAGIC = b"TUSKSNAP"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<8sHHIqq")
+
+
+def snapshot_path(source_path):
+    """tasks_data.json -> tasks_data.snap"""
+    return os.path.splitext(source_path)[0] + ".snap"
+
+
+def write_snapshot(tasks, source_path, source_stat=None, path=None):
+    """Write a snapshot of tasks, stamped with the stat of the JSON they were saved to or read from.
+
+    Pass the stat of that exact file (the temp file before it is renamed into
+    place, or os.fstat of the file that was read): stat'ing source_path here
+    could pick up a newer file another writer put there in the meantime.
+    """
+    path = path or snapshot_path(source_path)
+    source = source_stat or os.stat(source_path)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, marshal.version, len(tasks),
+                            source.st_mtime_ns, source.st_size))
+        marshal.dump(tasks, f)
+    os.replace(tmp_path, path)
+    return path
+
+
+# ============================================================
+# SECTION 2: READER
+# ============================================================
+class TaskSnapshot:
+    """Read-only view of a snapshot file.
+
+    Opening maps the file and reads only the header, so checking whether a
+    snapshot is current costs nothing; tasks() decodes the records straight
+    out of the mapping.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:      # empty file
+            self._file.close()
+            raise
+        try:
+            magic, version, marshal_version, self.count, self.source_mtime_ns, self.source_size = \
+                HEADER.unpack_from(self._map)
+        except struct.error:
+            magic = None
+        if magic != MAGIC or version != FORMAT_VERSION or marshal_version != marshal.version:
+            self.close()
+            raise ValueError(f"{path} is not a compatible task snapshot")
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def is_current(self, source_path):
+        try:
+            source = os.stat(source_path)
+        except OSError:
+            return False
+        return (source.st_mtime_ns, source.st_size) == (self.source_mtime_ns, self.source_size)
+
+    def tasks(self):
+        with memoryview(self._map)[HEADER.size:] as records:
+            return marshal.loads(records)
+
+
+def open_snapshot(source_path):
+    """The snapshot for source_path if one exists and is up to date, else None"""
+    path = snapshot_path(source_path)
+    try:
+        snapshot = TaskSnapshot(path)
+    except (OSError, ValueError):
+        return None
+    if not snapshot.is_current(source_path):
+        snapshot.close()
+        return None
+    return snapshot
@@ -0,0 +1,189 @@
+# ============================================================
+# TUSK - Team Analytics
+# Completion and throughput report across many task stores
+# (workspace partitions, exported backups, JS array exports)
+#
+# Usage: python team_analytics.py <file-or-directory>... [--workers N] [--json]
+# ============================================================
+
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from schema_bridge import iter_task_records, to_python_task
+
+
+# ============================================================
+# SECTION 1: PARTIAL AGGREGATES
+# ============================================================
+STORE_FILENAME = "tasks_data.json"
+
+
+def _minutes(hhmm):
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def _week_of(stamp):
+    """'2026-10-19 14:05' -> '2026-W43'"""
+    year, week, _ = date.fromisoformat(stamp[:10]).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def empty_aggregate():
+    return {
+        'stores': 0,
+        'total_tasks': 0,
+        'completed_count': 0,
+        'by_priority': Counter(),
+        'by_category': Counter(),
+        'duration_hours': 0.0,
+        'duration_count': 0,
+        'completed_by_week': Counter(),
+        'failed': [],
+    }
+
+
+def aggregate_tasks(tasks, agg=None):
+    """Fold task records into an aggregate; counts match app.calculate_analytics"""
+    agg = agg if agg is not None else empty_aggregate()
+    for task in tasks:
+        agg['total_tasks'] += 1
+        agg['by_priority'][task['priority']] += 1
+        agg['by_category'][task.get('category', 'General')] += 1
+        if task['status'] != 'completed':
+            continue
+        agg['completed_count'] += 1
+        try:
+            # Same wrap-around as timedelta.seconds for an end before the start
+            span = (_minutes(task['end_time']) - _minutes(task['start_time'])) % (24 * 60)
+            agg['duration_hours'] += span / 60
+            agg['duration_count'] += 1
+        except (KeyError, ValueError, AttributeError):
+            pass
+        if task.get('completed_at'):
+            try:
+                agg['completed_by_week'][_week_of(task['completed_at'])] += 1
+            except ValueError:
+                pass
+    return agg
+
+
+def aggregate_store(path):
+    """Partial aggregate of one task file; runs in a worker process.
+
+    A file that fails partway through contributes nothing but its failure.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            agg = aggregate_tasks(to_python_task(r) for r in iter_task_records(f))
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        failed = empty_aggregate()
+        failed['failed'].append(f"{path}: {e}")
+        return failed
+    agg['stores'] = 1
+    return agg
+
+
+def merge_aggregates(parts):
+    total = empty_aggregate()
+    for part in parts:
+        for key, value in part.items():
+            if isinstance(value, Counter):
+                total[key].update(value)
+            else:
+                total[key] += value
+    return total
+
+
+# ============================================================
+# SECTION 2: FAN-OUT
+# ============================================================
+def find_stores(paths):
+    """Expand directories into the task files below them"""
+    stores = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                if STORE_FILENAME in files:
+                    stores.append(os.path.join(root, STORE_FILENAME))
+        else:
+            stores.append(path)
+    return stores
+
+
+def collect_analytics(stores, workers=None):
+    """Aggregate every store, one process per core unless workers == 1.
+
+    Each worker streams its own files and sends back only a handful of
+    counters, so the merge cost does not grow with the number of tasks.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(stores) < 2:
+        return merge_aggregates(map(aggregate_store, stores))
+    chunksize = max(1, len(stores) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=min(workers, len(stores))) as pool:
+        return merge_aggregates(pool.map(aggregate_store, stores, chunksize=chunksize))
+
+
+def summarize(agg):
+    """Report in the shape of calculate_analytics plus team-wide throughput"""
+    total = agg['total_tasks']
+    return {
+        'stores': agg['stores'],
+        'total_tasks': total,
+        'completed_count': agg['completed_count'],
+        'completion_rate': round(agg['completed_count'] / total * 100, 1) if total else 0,
+        'by_priority': dict(agg['by_priority']),
+        'by_category': dict(agg['by_category']),
+        'avg_duration': round(agg['duration_hours'] / agg['duration_count'], 1) if agg['duration_count'] else 0,
+        'completed_by_week': dict(sorted(agg['completed_by_week'].items())),
+        'failed': agg['failed'],
+    }
+
+
+# ============================================================
+# SECTION 3: COMMAND LINE
+# ============================================================
+def print_report(report):
+    print(f"Stores:          {report['stores']}")
+    print(f"Tasks:           {report['total_tasks']}")
+    print(f"Completed:       {report['completed_count']} ({report['completion_rate']}%)")
+    print(f"Avg duration:    {report['avg_duration']}h")
+    for title, counts in (("By priority", report['by_priority']), ("By category", report['by_category'])):
+        print(f"{title}:")
+        for name, count in sorted(counts.items(), key=lambda item: -item[1]):
+            print(f"  {name:<14} {count}")
+    if report['completed_by_week']:
+        print("Completed per week:")
+        for week, count in report['completed_by_week'].items():
+            print(f"  {week:<14} {count}")
+    for failure in report['failed']:
+        print(f"Skipped {failure}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Completion and throughput report across TUSK task stores")
+    parser.add_argument("paths", nargs="+", help="task files, or directories searched for tasks_data.json")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+    stores = find_stores(args.paths)
+    if not stores:
+        print("No task stores found", file=sys.stderr)
+        return 1
+    report = summarize(collect_analytics(stores, args.workers))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+import os
+import sys
+import types
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+ARCHIVE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ARCHIVE_DIR, "app.py")
+
+# The helper modules import each other by bare name, as they do when run from archive/
+sys.path.insert(0, ARCHIVE_DIR)
+
+
+@pytest.fixture(scope="session")
+def app():
+    """app.py's definitions (sections up to session state), without running the page"""
+    pytest.importorskip("streamlit")
+    pytest.importorskip("pandas")
+    with open(APP_PATH, encoding="utf-8") as f:
+        source = f.read()
+    end = source.rindex("# ====", 0, source.index("SESSION STATE INITIALIZATION"))
+    namespace = {"__name__": "tusk_app", "__file__": APP_PATH}
+    exec(compile(source[:end], APP_PATH, "exec"), namespace)
+    return types.SimpleNamespace(**namespace)
+
+
+NOW = datetime(2026, 3, 10, 12, 0)
+
+
+@pytest.fixture
+def now():
+    return NOW
+
+
+@pytest.fixture
+def random_task(app):
+    """Factory for pending tasks at random March dates and times, some past midnight"""
+    def make(rnd, i):
+        start = time(rnd.randrange(0, 23), rnd.choice((0, 15, 30, 45)))
+        end = (datetime.combine(date.min, start) + timedelta(minutes=rnd.choice((15, 60, 120, 600)))).time()
+        return app.make_task(f"Task {i}", rnd.choice(("High", "Medium", "Low")),
+                             rnd.choice(("Work", "Health", "General")), f"2026-03-{rnd.randint(1, 28):02d}",
+                             start.strftime("%H:%M"), end.strftime("%H:%M"), NOW)
+    return make
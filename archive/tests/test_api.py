@@ -0,0 +1,26 @@
+import pytest
+
+TASK = {"task": "Call client", "category": "Work", "priority": "High",
+        "scheduled_date": "2026-03-02", "start_time": "09:00", "end_time": "10:00"}
+
+
+@pytest.mark.parametrize("fields", [
+    {"category": "<img src=x onerror=alert(1)>"}, {"category": 3}, {"priority": "Urgent"}, {"task": " "},
+    {"scheduled_date": "2026-3-2"}, {"scheduled_date": "2026-02-30"}, {"start_time": "9:00"}, {"end_time": "24:00"},
+])
+def test_create_rejects_bad_fields(app, fields):
+    tasks = []
+    [result] = app.api_create(tasks, [{**TASK, **fields}])
+    assert not result['ok'] and tasks == []
+
+
+def test_update_keeps_task_on_bad_category(app):
+    tasks = []
+    created, refused = app.api_create(tasks, [TASK, "not an object"])
+    assert created['ok'] and not refused['ok']
+    [result] = app.api_update(tasks, [{"id": created['id'], "updates": {"category": "Groceries"}}])
+    assert not result['ok'] and tasks[0]['category'] == "Work"
+
+
+def test_category_badge_is_escaped(app):
+    assert "<b>" not in app.render_category_badge({"category": "<b>bold</b>"})
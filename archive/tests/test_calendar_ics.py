@@ -0,0 +1,137 @@
+import io
+import time
+from datetime import datetime
+
+import pytest
+
+from calendar_ics import (LINE_OCTETS, ZoneInfo, component_to_task, escape_text, fold, iter_ics_components,
+                          iter_ics_tasks, parse_ics_datetime, parse_ics_duration, unescape_text, unfold,
+                          write_ics)
+
+
+def task(i, **fields):
+    return {
+        "id": f"task-{i}", "task": f"Task {i}", "priority": "Medium", "category": "Work",
+        "status": "pending", "added_at": "2026-03-01 08:00", "scheduled_date": "2026-03-02",
+        "start_time": "09:00", "end_time": "10:00", **fields,
+    }
+
+
+@pytest.mark.parametrize("line", [
+    "SUMMARY:short",
+    "SUMMARY:" + "x" * 200,
+    "SUMMARY:" + "é" * 100,          # two-byte characters straddle every fold
+    "SUMMARY:" + "🐘" * 60,          # four-byte characters
+    "SUMMARY:" + "ab✓" * 70,
+])
+def test_fold_round_trip(line):
+    folded = fold(line)
+    physical = folded.split("\r\n")[:-1]
+    assert folded.endswith("\r\n")
+    assert all(len(p.encode("utf-8")) <= LINE_OCTETS for p in physical)
+    assert all(p.startswith(" ") for p in physical[1:])
+    assert list(unfold(io.StringIO(folded, newline=""))) == [line]
+
+
+@pytest.mark.parametrize("text", ["plain", "a,b;c\\d", "line one\nline two", "trailing \\", ";,\\n"])
+def test_escape_round_trip(text):
+    assert unescape_text(escape_text(text)) == text
+
+
+def test_export_import_round_trip():
+    tasks = [
+        task(1),
+        task(2, task="Semi;colon, comma \\ back\nnewline" + " long" * 30, priority="High", category="Finance"),
+        task(3, status="completed", completed_at="2026-03-02 10:00", priority="Low"),
+        task(4, start_time="23:30", end_time="00:30"),   # runs past midnight
+        task(5, task=" ".join(["Ünïcödé 🐘"] * 10), category="Health"),
+    ]
+    out = io.StringIO(newline="")
+    assert write_ics(tasks + [task(6, scheduled_date="someday")], out) == len(tasks)
+    now = datetime(2026, 3, 9, 12, 0)
+    imported = list(iter_ics_tasks(io.StringIO(out.getvalue(), newline=""), now))
+    fields = ("id", "task", "priority", "category", "status", "scheduled_date", "start_time", "end_time")
+    assert [{k: t[k] for k in fields} for t in imported] == [{k: t[k] for k in fields} for t in tasks]
+    assert imported[2]['completed_at'] == "2026-03-09 12:00"
+
+
+def events(text):
+    return list(iter_ics_components(io.StringIO(text.replace("\n", "\r\n"), newline="")))
+
+
+def test_foreign_events():
+    calendar = """BEGIN:VCALENDAR
+BEGIN:VEVENT
+UID:abc@example.com
+DTSTART:20260302T090000
+DURATION:PT1H30M
+SUMMARY:Dentist
+CATEGORIES:health,misc
+PRIORITY:2
+BEGIN:VALARM
+SUMMARY:not the event name
+END:VALARM
+END:VEVENT
+BEGIN:VEVENT
+UID:allday@example.com
+DTSTART;VALUE=DATE:20260305
+SUMMARY:Holiday
+END:VEVENT
+BEGIN:VTODO
+UID:todo@example.com
+DUE:20260306T170000
+STATUS:COMPLETED
+SUMMARY:Report
+END:VTODO
+BEGIN:VEVENT
+SUMMARY:No date
+END:VEVENT
+END:VCALENDAR
+"""
+    parsed = events(calendar)
+    assert [c for c, _ in parsed] == ["VEVENT", "VEVENT", "VTODO", "VEVENT"]
+    assert parsed[0][1]["SUMMARY"] == [({}, "Dentist")]
+    tasks = [component_to_task(c, props, datetime(2026, 3, 1)) for c, props in parsed]
+    dentist, holiday, report, undated = tasks
+    assert (dentist['task'], dentist['category'], dentist['priority']) == ("Dentist", "Health", "High")
+    assert (dentist['scheduled_date'], dentist['start_time'], dentist['end_time']) == ("2026-03-02", "09:00", "10:30")
+    assert (holiday['scheduled_date'], holiday['start_time'], holiday['end_time']) == ("2026-03-05", "09:00", "10:00")
+    assert (report['status'], report['start_time']) == ("completed", "17:00")
+    assert undated is None
+    # Stable ids: importing the same calendar twice updates instead of duplicating
+    again = [component_to_task(c, props) for c, props in events(calendar)]
+    assert [t['id'] for t in tasks[:3]] == [t['id'] for t in again[:3]]
+
+
+@pytest.fixture
+def paris_time(monkeypatch):
+    if not hasattr(time, "tzset"):
+        pytest.skip("needs time.tzset")
+    monkeypatch.setenv("TZ", "Europe/Paris")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_times_convert_to_local(paris_time):
+    assert parse_ics_datetime({}, "20260302T090000") == datetime(2026, 3, 2, 9, 0)
+    assert parse_ics_datetime({}, "20260302T080000Z") == datetime(2026, 3, 2, 9, 0)
+    if ZoneInfo is not None:
+        try:
+            ZoneInfo("America/New_York")
+        except Exception:
+            pytest.skip("no time zone database")
+        assert parse_ics_datetime({"TZID": "America/New_York"}, "20260302T030000") == datetime(2026, 3, 2, 9, 0)
+        assert parse_ics_datetime({"TZID": "Not/AZone"}, "20260302T030000") == datetime(2026, 3, 2, 3, 0)
+
+
+@pytest.mark.parametrize("value, minutes", [("PT1H", 60), ("PT90M", 90), ("P1DT2H", 26 * 60), ("P1W", 7 * 24 * 60),
+                                            ("-PT15M", -15)])
+def test_durations(value, minutes):
+    assert parse_ics_duration(value).total_seconds() == minutes * 60
+
+
+def test_bad_duration():
+    with pytest.raises(ValueError):
+        parse_ics_duration("1 hour")
@@ -0,0 +1,23 @@
+import random
+from datetime import datetime, timedelta
+
+
+def test_interval_index_matches_scan(app, random_task):
+    rnd = random.Random(11)
+    tasks = [random_task(rnd, i) for i in range(300)]
+    for task in tasks[::4]:
+        task['status'] = 'completed'
+    index = app.IntervalIndex(tasks)
+    pending = [t for t in tasks if t['status'] == 'pending']
+    for task in rnd.sample(pending, 40):
+        task.update(start_time="13:00", end_time="15:00")
+        index.add(task)
+    for task in rnd.sample(pending, 20):
+        index.remove(task['id'])
+        pending.remove(task)
+    for _ in range(200):
+        start = datetime(2026, 3, rnd.randint(1, 28), rnd.randrange(24), rnd.choice((0, 30)))
+        end = start + timedelta(minutes=rnd.choice((15, 90, 300)))
+        expected = sorted(t['id'] for t in pending
+                          if app.get_task_interval(t)[0] < end and app.get_task_interval(t)[1] > start)
+        assert sorted(t['id'] for t in index.overlaps(start, end)) == expected
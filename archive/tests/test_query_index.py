@@ -0,0 +1,60 @@
+import random
+
+QUERIES = [
+    "", "priority:high", "priority:high,low", "category:work", "status:completed", "status:pending",
+    "due:today", "due:<=2026-03-05", "due:>2026-03-20", "due:>=-3d due:<+3d", "overdue:true",
+    "overdue:false priority:low", "category:health status:done due:<2026-03-15", '"task 1"', "task",
+]
+
+
+def assert_queries_match(app, index, tasks, now):
+    for query in QUERIES:
+        plan = app.compile_query(query, now.date())
+        indexed = sorted(t['id'] for t in app.run_query(plan, index, tasks, now))
+        scanned = sorted(t['id'] for t in app.filter_tasks(tasks, query, now))
+        assert indexed == scanned, query
+
+
+def test_query_index_matches_scan_under_edits(app, random_task, now):
+    rnd = random.Random(7)
+    tasks = [random_task(rnd, i) for i in range(400)]
+    index = app.TaskQueryIndex(tasks)
+    assert_queries_match(app, index, tasks, now)
+    for step in range(600):
+        task = rnd.choice(tasks)
+        op = rnd.random()
+        if op < 0.35:
+            # Edits change the dict in place before re-indexing it, like update_task
+            task.update(scheduled_date=f"2026-03-{rnd.randint(1, 28):02d}",
+                        priority=rnd.choice(("High", "Medium", "Low")))
+            index.add(task)
+        elif op < 0.55:
+            task.update(status='completed', completed_at=now.strftime("%Y-%m-%d %H:%M"))
+            index.add(task)
+        elif op < 0.75:
+            tasks.remove(task)
+            index.remove(task['id'])
+        else:
+            new = random_task(rnd, 1000 + step)
+            tasks.append(new)
+            index.add(new)
+        if step % 50 == 0:
+            assert_queries_match(app, index, tasks, now)
+    assert len(index) == len(tasks)
+    assert_queries_match(app, index, tasks, now)
+
+
+def test_rescheduled_then_deleted_task_leaves_no_date_entry(app, now):
+    task = app.make_task("Move me", "High", "Work", "2026-03-02", "09:00", "10:00", now)
+    tasks = [task]
+    index = app.TaskQueryIndex(tasks)
+    task.update(scheduled_date="2026-03-09")
+    index.add(task)
+    tasks.remove(task)
+    index.remove(task['id'])
+    assert app.run_query(app.compile_query("due:<=2026-03-05", now.date()), index, tasks, now) == []
+    assert index.date_slice(None, None) == (0, 0)
+
+
+def test_empty_index_is_used(app, now):
+    assert app.run_query(app.compile_query("priority:high", now.date()), app.TaskQueryIndex([]), [], now) == []
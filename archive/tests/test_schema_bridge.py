@@ -0,0 +1,68 @@
+import io
+import json
+
+import pytest
+
+from schema_bridge import (iter_task_records, js_to_python, python_to_js, to_python_task,
+                           write_js_array, write_python_backup)
+
+
+RECORDS = [
+    {"id": "a", "task": "Plain", "priority": "High", "status": "pending", "seq": 12345678901234567890},
+    {"id": "b", "task": "Ünïcödé ✓ \"quoted\" \\ back", "status": "completed", "score": -1.5e-7},
+    {"id": "c", "task": "Nested", "tags": [[], {}, [1, [2, {"x": None}]]], "flag": True, "none": None},
+    {"id": "d", "task": " " * 40 + "padded", "n": 0},
+]
+
+
+def read(text, chunk_size):
+    return list(iter_task_records(io.StringIO(text), chunk_size))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 64, 65536])
+@pytest.mark.parametrize("wrap", [
+    lambda records: json.dumps(records),
+    lambda records: json.dumps(records, indent=4),
+    lambda records: json.dumps({"version": "2.0", "meta": {"tasks": "not this"}, "tasks": records, "z": [1, 2]}),
+    lambda records: json.dumps({"tasks": records}, indent=1),
+])
+def test_chunk_boundaries(chunk_size, wrap):
+    # Small chunks split every token, including numbers, escapes and multi-byte characters
+    assert read(wrap(RECORDS), chunk_size) == RECORDS
+
+
+@pytest.mark.parametrize("text", ["[]", " [ ] ", '{"tasks": []}', '{"a": 1, "tasks": []}'])
+def test_empty(text):
+    assert read(text, 2) == []
+
+
+@pytest.mark.parametrize("text", ['{"x": 1}', "{}", '{"tasks": 5}', "[1, 2", '{"tasks": [1,] }', "7", ""])
+def test_rejects_bad_input(text):
+    with pytest.raises(ValueError):
+        read(text, 3)
+
+
+def test_backup_writer_round_trip():
+    out = io.StringIO()
+    assert write_python_backup(RECORDS, out) == len(RECORDS)
+    assert read(out.getvalue(), 5) == RECORDS
+    out = io.StringIO()
+    assert write_python_backup([], out) == 0
+    assert read(out.getvalue(), 5) == []
+
+
+def test_js_round_trip():
+    tasks = [{
+        "id": "t1", "task": "Call client", "priority": "High", "category": "Work", "status": "completed",
+        "added_at": "2026-03-01 08:30", "scheduled_date": "2026-03-02", "start_time": "09:00",
+        "end_time": "10:30", "completed_at": "2026-03-02 10:15", "remembered": True,
+    }, {
+        "id": "t2", "task": "Gym", "priority": "Low", "category": "Health", "status": "pending",
+        "added_at": "2026-03-01 07:00", "scheduled_date": "2026-03-03", "start_time": "18:00", "end_time": "19:00",
+    }]
+    out = io.StringIO()
+    write_js_array(tasks, out)
+    records = read(out.getvalue(), 4)
+    assert [r['name'] for r in records] == ["Call client", "Gym"]
+    assert [js_to_python(r) for r in records] == tasks
+    assert [to_python_task(python_to_js(t)) for t in tasks] == tasks
@@ -0,0 +1,22 @@
+import random
+
+import pytest
+
+
+@pytest.mark.parametrize("priority", ["High", "Low"])
+def test_sorted_views_match_scan(app, random_task, now, priority):
+    rnd = random.Random(3)
+    tasks = [random_task(rnd, i) for i in range(200)]
+    for task in tasks[::3]:
+        task.update(status='completed', completed_at=f"2026-03-{rnd.randint(1, 9):02d} 10:{rnd.randint(10, 59)}")
+    views = app.SortedTaskViews(tasks)
+    for task in tasks[:30]:
+        task['priority'] = priority
+        views.add(task)
+    started = [t for t in tasks if t['status'] == 'pending' and app.get_task_interval(t)[0] <= now]
+    assert {t['id'] for t, _ in views.active(now)} == {t['id'] for t in started}
+    upcoming = sorted((t for t in tasks if t['status'] == 'pending' and t not in started),
+                      key=lambda t: (app.get_task_interval(t)[0], t['id']))
+    assert [t['id'] for t in views.upcoming(now)] == [t['id'] for t in upcoming]
+    done = sorted((t for t in tasks if t['status'] == 'completed'), key=lambda t: (t['completed_at'], t['id']))
+    assert [t['id'] for t in views.done()] == [t['id'] for t in reversed(done)]
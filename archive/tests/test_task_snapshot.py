@@ -0,0 +1,92 @@
+import json
+import os
+import struct
+
+import pytest
+
+from task_snapshot import HEADER, TaskSnapshot, open_snapshot, snapshot_path, write_snapshot
+
+
+def make_tasks(count):
+    return [{
+        "id": f"task-{i}",
+        "task": f"Task {i} ✓",
+        "priority": ("High", "Medium", "Low")[i % 3],
+        "status": ("pending", "completed", "archived")[i % 3],
+        "scheduled_date": f"2026-03-{i % 28 + 1:02d}" if i % 7 else "not a date",
+        "start_time": "09:00",
+        "end_time": "10:00",
+    } for i in range(count)]
+
+
+def write_source(tmp_path, tasks):
+    source = tmp_path / "tasks_data.json"
+    source.write_text(json.dumps(tasks))
+    return str(source)
+
+
+@pytest.mark.parametrize("count", [0, 1, 1000])
+def test_round_trip(tmp_path, count):
+    tasks = make_tasks(count)
+    source = write_source(tmp_path, tasks)
+    write_snapshot(tasks, source)
+    with open_snapshot(source) as snapshot:
+        assert len(snapshot) == count
+        assert snapshot.tasks() == tasks
+
+
+def test_stale_snapshot_is_ignored(tmp_path):
+    tasks = make_tasks(10)
+    source = write_source(tmp_path, tasks)
+    write_snapshot(tasks, source)
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert open_snapshot(source) is None
+    write_snapshot(tasks, source)
+    with open(source, "a") as f:
+        f.write(" ")
+    assert open_snapshot(source) is None
+
+
+def test_missing_source_or_snapshot(tmp_path):
+    source = write_source(tmp_path, [])
+    assert open_snapshot(source) is None
+    write_snapshot([], source)
+    os.remove(source)
+    assert open_snapshot(source) is None
+
+
+@pytest.mark.parametrize("content", [b"", b"TUSKSNAP", b"x" * HEADER.size])
+def test_incompatible_file(tmp_path, content):
+    source = write_source(tmp_path, [])
+    with open(snapshot_path(source), "wb") as f:
+        f.write(content)
+    with pytest.raises(ValueError):
+        TaskSnapshot(snapshot_path(source))
+    assert open_snapshot(source) is None
+
+
+def test_other_format_version(tmp_path):
+    tasks = make_tasks(3)
+    source = write_source(tmp_path, tasks)
+    path = write_snapshot(tasks, source)
+    with open(path, "r+b") as f:
+        f.seek(8)
+        f.write(struct.pack("<H", 99))
+    assert open_snapshot(source) is None
+
+
+def test_stamped_with_the_written_file(tmp_path):
+    # A save stamps the snapshot from its own temp file before the rename. If another
+    # save replaces the JSON in between, the snapshot must not pass for current.
+    older, newer = make_tasks(1), make_tasks(2)
+    source = write_source(tmp_path, older)
+    tmp = tmp_path / "older.tmp"
+    tmp.write_text(json.dumps(older))
+    write_snapshot(older, source, os.stat(tmp))
+    os.replace(tmp, source)
+    with open_snapshot(source) as snapshot:
+        assert snapshot.tasks() == older
+    write_snapshot(older, source, os.stat(source))
+    write_source(tmp_path, newer)
+    assert open_snapshot(source) is None